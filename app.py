@@ -4,25 +4,87 @@ MVP Document Processor - Enhanced Flask Web Application
 Complete web interface with user inputs, comprehensive analysis, and disclaimer bookmarks
 """
 
-from flask import Flask, render_template, request, send_file, flash, redirect, url_for, jsonify
+from flask import Flask, Request, Response, render_template, request, send_file, flash, redirect, url_for, jsonify
 from werkzeug.utils import secure_filename
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
 import os
+import hashlib
+import json
+import queue
+import sqlite3
 import tempfile
+import threading
+import time
+import uuid
+import zipfile
+import zlib
+import struct
 import yaml
 import re
 from docx import Document
 from docx.shared import RGBColor, Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.oxml import serialize_part_xml
+from docx.opc.part import XmlPart
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, nsmap, qn
+from docx.text.paragraph import Paragraph
+from lxml import etree
 import datetime
+import math
+from bisect import bisect_right
 import textstat
-from collections import defaultdict
+from functools import lru_cache
+from collections import OrderedDict, defaultdict, namedtuple
 import io
+import html
+import contextlib
 from pathlib import Path
-import traceback
+
+class DocumentRequest(Request):
+    """Request that keeps uploaded documents in memory up to the spill-to-disk threshold"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=app.config['SPOOL_MAX_SIZE'], mode='rb+')
+    
+    @property
+    def max_content_length(self):
+        # Batch uploads carry many documents, so they get their own size limit
+        if self.path == '/process/batch':
+            return app.config['MAX_BATCH_CONTENT_LENGTH']
+        return super().max_content_length
 
 app = Flask(__name__)
+app.request_class = DocumentRequest
 app.secret_key = os.environ.get('SECRET_KEY', 'mvp-processor-secret-key-change-in-production')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['SPOOL_MAX_SIZE'] = 8 * 1024 * 1024  # Uploads and outputs above 8MB spill to disk
+app.config['MAX_BATCH_CONTENT_LENGTH'] = 256 * 1024 * 1024  # 256MB max batch upload
+app.config['MAX_BATCH_FILES'] = 200
+app.config['MAX_BATCH_UNCOMPRESSED_SIZE'] = 2 * app.config['MAX_BATCH_CONTENT_LENGTH']  # Documents in one batch, after unzipping
+app.config['BATCH_WORKERS'] = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 1))
+app.config['JOB_DIR'] = os.environ.get('JOB_DIR', os.path.join(tempfile.gettempdir(), 'mvp-processor-jobs'))
+app.config['JOB_TTL'] = 60 * 60  # Async job inputs and results are kept for an hour
+app.config['JOB_MAX_ATTEMPTS'] = 2  # Runs of a job whose worker exits mid-job before it is marked failed
+app.config['RESULT_CACHE_MAX_ENTRIES'] = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 256))
+app.config['RESULT_CACHE_MAX_BYTES'] = int(os.environ.get('RESULT_CACHE_MAX_MB', 128)) * 1024 * 1024
+app.config['RESULT_CACHE_TTL'] = int(os.environ.get('RESULT_CACHE_TTL', 60 * 60))
+app.config['RESULT_CACHE_DIR'] = os.environ.get('RESULT_CACHE_DIR')  # Optional on-disk tier shared by workers
+app.config['RESULT_CACHE_DISK_MAX_BYTES'] = int(os.environ.get('RESULT_CACHE_DISK_MAX_MB', 1024)) * 1024 * 1024
+app.config['XML_FAST_PATH'] = os.environ.get('XML_FAST_PATH', '0') == '1'  # Rule pass reads and writes w:t elements directly
+app.config['PASSTHROUGH_SAVE'] = os.environ.get('PASSTHROUGH_SAVE', '1') == '1'  # Copy untouched package parts raw on save
+app.config['MAX_KEYWORDS'] = int(os.environ.get('MAX_KEYWORDS', 50))  # SEO keywords tracked per document
+app.config['STREAM_HEARTBEAT'] = 10  # Seconds between keep-alive lines while a streamed stage runs
+app.config['RULES_DIR'] = os.environ.get('RULES_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules'))
+app.config['RULES_CACHE_DIR'] = os.environ.get('RULES_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'mvp-processor-rules'))
+app.config['RULES_RELOAD_INTERVAL'] = float(os.environ.get('RULES_RELOAD_INTERVAL', 5))  # Seconds between rule pack checks
+app.config['PROFILE_RULES'] = os.environ.get('PROFILE_RULES', '0') == '1'  # Profile every document's rules, not just on request
+app.config['METRICS_DB'] = os.environ.get('METRICS_DB', os.path.join(app.config['JOB_DIR'], 'metrics.sqlite3'))
+
+# Per-document detail is logged at DEBUG, so by default it is never even formatted
+logger = app.logger
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
 
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'docx'}
@@ -30,339 +92,1505 @@ ALLOWED_EXTENSIONS = {'docx'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-class MVPDocumentProcessor:
+# A single precompiled rule: everything the per-paragraph loop needs, resolved up front.
+# expand turns a match into its replacement text, like re.sub does with replacement.
+CompiledRule = namedtuple('CompiledRule', ['category_name', 'rule_id', 'pattern', 'replacement', 'expand'])
+
+# Group references are the only escapes compile_replacement resolves itself
+TEMPLATE_GROUP_REFERENCE = re.compile(r'\\(?:g<(\w+)>|([1-9][0-9]?))')
+
+def compile_replacement(replacement):
+    """Return a match -> text function for a re.sub replacement, parsing a template only once
+
+    match.expand parses its template again on every call; the rule pass expands every
+    match itself to know where each edit lands, so simple templates are split up front.
     """
-    Enhanced MVP Document Processor with user inputs, comprehensive analysis, and disclaimer bookmarks
+    if callable(replacement):
+        return replacement
+    
+    pieces = TEMPLATE_GROUP_REFERENCE.split(replacement)
+    literals = pieces[::3]
+    if any('\\' in literal for literal in literals):
+        return lambda match: match.expand(replacement)
+    if len(literals) == 1:
+        return lambda match: replacement
+    
+    groups = [int(number) if number else (int(name) if name.isdigit() else name)
+              for name, number in zip(pieces[1::3], pieces[2::3])]
+    
+    def expand(match):
+        parts = [literals[0]]
+        for group, literal in zip(groups, literals[1:]):
+            parts.append(match.group(group) or '')
+            parts.append(literal)
+        return ''.join(parts)
+    return expand
+
+# Bump when the way rules are matched or results are built changes, so results cached
+# by an older engine are not reused
+RULE_ENGINE_VERSION = 5
+
+def rule_plan_version(*rule_plans):
+    """Stable fingerprint of compiled rule plans, for keying cached results"""
+    digest = hashlib.sha256(f'engine-{RULE_ENGINE_VERSION}\0'.encode('utf-8'))
+    for rule_plan in rule_plans:
+        for rule in rule_plan:
+            replacement = rule.replacement
+            if callable(replacement):
+                code = replacement.__code__
+                replacement = code.co_code + repr(code.co_consts).encode('utf-8')
+            else:
+                replacement = replacement.encode('utf-8')
+            digest.update(f'{rule.category_name}\0{rule.rule_id}\0{rule.pattern.pattern}\0{rule.pattern.flags}\0'.encode('utf-8'))
+            digest.update(replacement)
+        digest.update(b'\1')
+    return digest.hexdigest()[:16]
+
+def compile_rule_plan(rules, enabled_categories=()):
+    """Compile a rule set into an ordered, immutable plan of precompiled rules
+
+    Rules in enabled_categories are compiled even when their 'enabled' flag is off,
+    so optional rule groups (e.g. Medicare) never require mutating the shared rules.
+    """
+    plan = []
+    for category_name, category_rules in rules.items():
+        if not isinstance(category_rules, list):
+            continue
+
+        force_enabled = category_name in enabled_categories
+        for rule in category_rules:
+            if not isinstance(rule, dict):
+                continue
+            if not force_enabled and not rule.get('enabled', True):
+                continue
+
+            find_pattern = rule.get('find', '')
+            replacement = rule.get('replace', '')
+
+            if not find_pattern:
+                continue
+
+            if rule.get('is_function', False) and callable(replacement):
+                flags = re.IGNORECASE
+            else:
+                flags = 0 if rule.get('case_sensitive', False) else re.IGNORECASE
+
+            try:
+                pattern = re.compile(find_pattern, flags)
+            except re.error as e:
+                logger.warning("⚠️ Regex error in rule %s: %s", rule.get('category', 'unknown'), e)
+                continue
+
+            plan.append(CompiledRule(
+                category_name=category_name,
+                rule_id=rule.get('category', 'Unknown'),
+                pattern=pattern,
+                replacement=replacement,
+                expand=compile_replacement(replacement)
+            ))
+
+    return tuple(plan)
+
+# Words for the single digits spelled out by spell_out_small_numbers
+NUMBER_WORDS = {
+    '1': 'one', '2': 'two', '3': 'three', '4': 'four', '5': 'five',
+    '6': 'six', '7': 'seven', '8': 'eight', '9': 'nine'
+}
+
+# Replacements a template cannot express, named by rule packs with replace_function
+REPLACEMENT_FUNCTIONS = {
+    'number_word': lambda m: NUMBER_WORDS[m.group(1)],
+    'uppercase': lambda m: m.group(1).upper(),
+}
+
+# Rule packs: YAML files of rule categories, validated against RULE_FIELDS
+DEFAULT_RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules')
+RULE_PACK_VERSION = 1
+RULE_FIELDS = {
+    'category': str,
+    'find': str,
+    'replace': str,
+    'replace_function': str,
+    'case_sensitive': bool,
+    'description': str,
+    'enabled': bool,
+    'first_instance_only': bool,
+}
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+# Word and non-word characters a rule's pattern is tried on, to catch patterns that
+# match the empty string somewhere (\b, ^, $, a*) rather than only on empty text
+EMPTY_MATCH_PROBE = 'Aa 0_ é.,;:-–()[]<>/\'"\t\n\u01c2 zZ9'
+
+class RulePackError(ValueError):
+    """A rule pack that cannot be loaded: unreadable YAML or a rule that fails validation"""
+
+def validate_rule_pack(data, source):
+    """Check a parsed rule pack against the schema, returning its categories of rule dicts"""
+    if not isinstance(data, dict) or data.get('version') != RULE_PACK_VERSION:
+        raise RulePackError(f'{source}: expected a mapping with version: {RULE_PACK_VERSION}')
+    unknown = set(data) - {'version', 'categories'}
+    if unknown:
+        raise RulePackError(f"{source}: unknown top-level field(s) {', '.join(sorted(unknown))}")
+    categories = data.get('categories')
+    if not isinstance(categories, dict):
+        raise RulePackError(f'{source}: categories must map category names to lists of rules')
+    
+    for category_name, rules in categories.items():
+        if not isinstance(rules, list):
+            raise RulePackError(f'{source}: {category_name} must be a list of rules')
+        for position, rule in enumerate(rules):
+            where = f'{source}: {category_name}[{position}]'
+            if not isinstance(rule, dict):
+                raise RulePackError(f'{where}: a rule must be a mapping')
+            where = f"{where} ({rule.get('category', 'no category')})"
+            
+            for field, value in rule.items():
+                if field not in RULE_FIELDS:
+                    raise RulePackError(f"{where}: unknown field '{field}'")
+                if not isinstance(value, RULE_FIELDS[field]):
+                    raise RulePackError(f"{where}: '{field}' must be a {RULE_FIELDS[field].__name__}")
+            for field in ('category', 'find'):
+                if not rule.get(field):
+                    raise RulePackError(f"{where}: '{field}' is required")
+            if ('replace' in rule) == ('replace_function' in rule):
+                raise RulePackError(f"{where}: give exactly one of 'replace' and 'replace_function'")
+            if 'replace_function' in rule and rule['replace_function'] not in REPLACEMENT_FUNCTIONS:
+                raise RulePackError(f"{where}: unknown replace_function '{rule['replace_function']}'")
+            
+            try:
+                pattern = re.compile(rule['find'], 0 if rule.get('case_sensitive', False) else re.IGNORECASE)
+            except re.error as e:
+                raise RulePackError(f"{where}: invalid 'find' pattern: {e}")
+            if pattern.fullmatch(PROTECTED_SPAN_MARK):
+                raise RulePackError(f"{where}: 'find' matches the protected span mark {PROTECTED_SPAN_MARK!r} on its own")
+            # An empty match inserts text at a position, which could sit right at the edge
+            # of protected content, and no corporate rule needs one
+            if pattern.fullmatch('') or any(match.start() == match.end() for match in pattern.finditer(EMPTY_MATCH_PROBE)):
+                raise RulePackError(f"{where}: 'find' can match the empty string; a rule must match at least one character")
+            for name, number in TEMPLATE_GROUP_REFERENCE.findall(rule.get('replace', '')):
+                group = number or name
+                if not (int(group) <= pattern.groups if group.isdigit() else group in pattern.groupindex):
+                    raise RulePackError(f"{where}: 'replace' refers to missing group {group}")
+    return categories
+
+def rule_pack_paths(rules_dir):
+    """The rule pack files in a directory, in load order"""
+    return sorted(os.path.join(rules_dir, name) for name in os.listdir(rules_dir)
+                  if name.endswith(('.yaml', '.yml')) and not name.startswith('.'))
+
+def rule_pack_signature(rules_dir):
+    """Cheap fingerprint of the rule pack files (names, sizes and mtimes) for change detection"""
+    signature = []
+    for path in rule_pack_paths(rules_dir):
+        stat = os.stat(path)
+        signature.append((os.path.basename(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+def load_rule_packs(rules_dir, cache_dir=None):
+    """Load and validate every rule pack in rules_dir, merged in file name order
+
+    Returns plain, JSON-serializable categories of rule dicts. With a cache_dir the
+    validated result is kept on disk, keyed by the packs' contents and the engine and
+    schema versions, so other workers and restarts skip parsing and validation.
     """
+    paths = rule_pack_paths(rules_dir)
+    if not paths:
+        raise RulePackError(f'No rule packs (*.yaml) found in {rules_dir}')
     
-    def __init__(self):
-        self.corrections_made = []
-        self.statistics = {
-            'total_corrections': 0,
-            'rules_applied': defaultdict(int),
-            'word_count': 0,
-            'sentence_count': 0,
-            'paragraph_count': 0,
-            'reading_level': 0
+    sources = []
+    digest = hashlib.sha256(f'engine-{RULE_ENGINE_VERSION}\0pack-{RULE_PACK_VERSION}\0'.encode('utf-8'))
+    for path in paths:
+        with open(path, 'rb') as pack_file:
+            source = pack_file.read()
+        sources.append((path, source))
+        digest.update(os.path.basename(path).encode('utf-8') + b'\0' + source + b'\1')
+    
+    cache_path = os.path.join(cache_dir, f'rules-{digest.hexdigest()[:32]}.json') if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as cache_file:
+                return json.load(cache_file, object_pairs_hook=OrderedDict)
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ Ignoring unreadable rule cache %s: %s", cache_path, e)
+    
+    categories = OrderedDict()
+    rule_ids = set()
+    for path, source in sources:
+        try:
+            data = yaml.load(source, Loader=YAML_LOADER)
+        except yaml.YAMLError as e:
+            raise RulePackError(f'{path}: invalid YAML: {e}')
+        for category_name, rules in validate_rule_pack(data, path).items():
+            for rule in rules:
+                if rule['category'] in rule_ids:
+                    raise RulePackError(f"{path}: duplicate rule '{rule['category']}'")
+                rule_ids.add(rule['category'])
+            categories.setdefault(category_name, []).extend(rules)
+    
+    if cache_path:
+        # Write then rename, so other workers never read a partial plan
+        temp_path = f'{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as cache_file:
+                json.dump(categories, cache_file)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            logger.warning("⚠️ Could not write rule cache: %s", e)
+    return categories
+
+def resolve_rules(categories):
+    """Turn validated rule pack categories into the rule dicts compile_rule_plan takes"""
+    rules = OrderedDict()
+    for category_name, category_rules in categories.items():
+        rules[category_name] = []
+        for rule in category_rules:
+            rule = dict(rule)
+            if 'replace_function' in rule:
+                rule['replace'] = REPLACEMENT_FUNCTIONS[rule.pop('replace_function')]
+                rule['is_function'] = True
+            rules[category_name].append(rule)
+    return rules
+
+class RuleSet:
+    """
+    A loaded rule set and the plans compiled from it. A reload builds a whole new
+    RuleSet, so a request never sees a mix of old and new rules.
+    """
+    
+    def __init__(self, rules, signature=None):
+        self.rules = rules
+        self.rule_plan = compile_rule_plan(rules)
+        self.medicare_rule_plan = compile_rule_plan(rules, enabled_categories=('medicare_rules',))
+        self.version = rule_plan_version(self.rule_plan, self.medicare_rule_plan)
+        self.signature = signature
+    
+    @classmethod
+    def load(cls, rules_dir, cache_dir=None):
+        """Load the rule packs in rules_dir into a RuleSet"""
+        signature = rule_pack_signature(rules_dir)
+        return cls(resolve_rules(load_rule_packs(rules_dir, cache_dir)), signature)
+
+# Top-level domains recognised as bare domain URLs (e.g. mvphealthcare.com)
+PROTECTED_TLDS = (
+    'com', 'org', 'gov', 'edu', 'net', 'mil', 'int', 'biz', 'info', 'name', 'museum',
+    'coop', 'aero', 'jobs', 'mobi', 'travel', 'tel', 'cat', 'asia', 'xxx', 'post',
+    'mail', 'corp', 'home', 'tv', 'cc', 'co', 'io', 'ly', 'me', 'us', 'uk', 'ca', 'au',
+    'de', 'fr', 'jp', 'cn', 'in', 'br', 'mx', 'es', 'it', 'nl', 'se', 'no', 'dk', 'fi',
+    'pl', 'be', 'ch', 'at', 'ie', 'pt', 'gr', 'cz', 'hu', 'ro', 'bg', 'hr', 'si', 'sk',
+    'lt', 'lv', 'ee', 'mt', 'cy', 'lu', 'is', 'li', 'ad', 'mc', 'sm', 'va', 'ma', 'dz',
+    'tn', 'eg', 'sd', 'so', 'dj', 'er', 'et', 'ke', 'ug', 'tz', 'rw', 'bi', 'mw', 'zm',
+    'zw', 'bw', 'sz', 'ls', 'za', 'na', 'mg', 'mu', 'sc', 'km', 'yt', 're', 'mz', 'ao',
+    'cd', 'cg', 'cm', 'cf', 'td', 'ne', 'ng', 'bj', 'tg', 'gh', 'ci', 'lr', 'sl', 'gn',
+    'gw', 'gm', 'sn', 'ml', 'bf', 'mr', 'cv', 'st', 'gq', 'ga', 've', 'gy', 'sr', 'pe',
+    'ec', 'bo', 'py', 'uy', 'ar', 'cl', 'fk', 'gs'
+)
+
+# Stands in for a protected span at the edge of an unprotected segment, so rules see
+# a word character there just as they did next to the old PROTECTED_CONTENT_N tokens.
+# Rules may match up to a mark but never across one (see _iter_rule_edits).
+PROTECTED_SPAN_MARK = '\u01c2'
+
+def _trie_pattern(words, end=''):
+    """Build a regex alternation for words, factored into a prefix trie
+
+    end is a pattern every word must be followed by; longer words are tried first.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def render(node):
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return end
+        optional = '' in node
+        if optional and end:
+            branches.append(end)
+            optional = False
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if optional else group
+
+    return render(trie)
+
+class ProtectedSpanScanner:
+    """
+    Single-pass scanner for content the corporate rules must never touch:
+    angle brackets, square brackets and URLs
+    """
+    
+    def __init__(self, tlds=PROTECTED_TLDS):
+        # Brackets take precedence over URLs and whole bracketed spans may sit inside
+        # a URL, and www. URLs take precedence over bare domains - the same priority
+        # the content had when each kind was extracted in its own pass
+        url_tail = r'(?:[^\s<\[]+|<[^>]*>|\[[^\]]*\]|[<\[])'
+        self.patterns = OrderedDict([
+            ('angle_brackets', r'<[^>]*>'),
+            ('square_brackets', r'\[[^\]]*\]'),
+            ('http_urls', r'https?://' + url_tail + '+'),
+            ('www_urls', r'www\.' + url_tail + '+'),
+            ('domains', r'\b(?:(?!www\.)[a-zA-Z0-9.-])+\.' + _trie_pattern(tlds) + r'\b' + url_tail + '*'),
+        ])
+        self.pattern = re.compile('|'.join(self.patterns.values()), re.IGNORECASE)
+        # Every protected span contains one of these; most runs contain none
+        self.candidate_pattern = re.compile(r'[<\[]|://|\.[a-zA-Z]')
+    
+    def find_spans(self, text):
+        """Return (start, end) offsets of every protected span in text, in order"""
+        if not self.candidate_pattern.search(text):
+            return []
+        return [match.span() for match in self.pattern.finditer(text)]
+
+def split_protected(text, spans):
+    """Split text around protected spans into (segments, protected)
+
+    Segments next to a protected span carry a PROTECTED_SPAN_MARK on that side.
+    """
+    if not spans:
+        return [text], []
+    
+    segments = []
+    protected = []
+    position = 0
+    for start, end in spans:
+        prefix = PROTECTED_SPAN_MARK if position else ''
+        segments.append(prefix + text[position:start] + PROTECTED_SPAN_MARK)
+        protected.append(text[start:end])
+        position = end
+    segments.append(PROTECTED_SPAN_MARK + text[position:])
+    return segments, protected
+
+def apply_run_edits(run_texts, edits):
+    """Apply (start, end, replacement) edits in paragraph offsets to the texts of its runs
+
+    Each edit is first trimmed to the characters that actually change. The replacement
+    goes into the run where the trimmed edit starts (an insertion extends the run before
+    it) and the replaced text is cut from every run it spans, so unchanged characters
+    keep their run and its formatting. Returns the new run texts.
+    """
+    text = ''.join(run_texts)
+    run_texts = list(run_texts)
+    
+    starts = []
+    ends = []
+    position = 0
+    for run_text in run_texts:
+        starts.append(position)
+        position += len(run_text)
+        ends.append(position)
+    
+    # Backwards, so the offsets of earlier edits still hold
+    for start, end, replacement in reversed(edits):
+        while start < end and replacement and text[start] == replacement[0]:
+            start += 1
+            replacement = replacement[1:]
+        while start < end and replacement and text[end - 1] == replacement[-1]:
+            end -= 1
+            replacement = replacement[:-1]
+        
+        if start == end:
+            first = bisect_right(ends, start - 1) if start else 0
+        else:
+            first = bisect_right(ends, start)
+        
+        run = first
+        while True:
+            run_text = run_texts[run]
+            cut = min(end, ends[run]) - starts[run]
+            if run == first:
+                run_texts[run] = run_text[:max(start - starts[run], 0)] + replacement + run_text[max(cut, 0):]
+            else:
+                run_texts[run] = run_text[cut:]
+            run += 1
+            if run == len(run_texts) or starts[run] >= end:
+                break
+    
+    return run_texts
+
+# Per-paragraph counts behind calculate_document_stats. head and tail are the
+# (lexicon count, has word) of the text before the first and after the last
+# sentence terminator, which join up with neighbouring paragraphs into sentences.
+ParagraphStats = namedtuple('ParagraphStats', [
+    'words', 'terminators', 'lexicon', 'syllables', 'head', 'complete_sentences', 'tail'
+])
+
+SENTENCE_TERMINATORS = re.compile(r'[.!?]+')
+WORD_CHARACTER = re.compile(r'\w')
+
+@lru_cache(maxsize=8192)
+def paragraph_stats(text):
+    """Word, sentence and syllable counts for one paragraph, cached by its text"""
+    pieces = SENTENCE_TERMINATORS.split(text)
+    fragments = [(textstat.lexicon_count(piece), WORD_CHARACTER.search(piece) is not None) for piece in pieces]
+    return ParagraphStats(
+        words=len(text.split()),
+        terminators=len(pieces) - 1,
+        lexicon=textstat.lexicon_count(text),
+        syllables=textstat.syllable_count(text),
+        head=fragments[0],
+        complete_sentences=sum(1 for lexicon, has_word in fragments[1:-1] if has_word and lexicon > 2),
+        tail=fragments[-1]
+    )
+
+def _textstat_round(number, points):
+    """textstat's legacy rounding, so aggregated grades match it exactly"""
+    p = 10 ** points
+    return float(math.floor((number * p) + math.copysign(0.5, number))) / p
+
+def flesch_kincaid_grade(paragraphs):
+    """textstat.flesch_kincaid_grade of paragraph texts joined with spaces, from their ParagraphStats"""
+    lexicon = 0
+    syllables = 0
+    sentences = 0
+    open_lexicon, open_has_word = 0, False
+    
+    for stats in paragraphs:
+        lexicon += stats.lexicon
+        syllables += stats.syllables
+        
+        # A paragraph without a terminator continues the open sentence into the next one;
+        # textstat ignores sentences of two words or fewer
+        open_lexicon += stats.head[0]
+        open_has_word = open_has_word or stats.head[1]
+        if stats.terminators:
+            if open_has_word and open_lexicon > 2:
+                sentences += 1
+            sentences += stats.complete_sentences
+            open_lexicon, open_has_word = stats.tail
+    
+    if open_has_word and open_lexicon > 2:
+        sentences += 1
+    sentences = max(1, sentences)
+    
+    sentence_length = _textstat_round(float(lexicon / sentences), 1)
+    syllables_per_word = _textstat_round(float(syllables) / float(lexicon), 1) if lexicon else 0.0
+    return _textstat_round(float(0.39 * sentence_length) + float(11.8 * syllables_per_word) - 15.59, 1)
+
+def _word_boundary(text, i):
+    """Whether \\b holds at offset i of text, for 0 < i < len(text)"""
+    return bool(WORD_CHARACTER.match(text[i - 1])) != bool(WORD_CHARACTER.match(text[i]))
+
+class KeywordScanner:
+    """
+    Single-pass scanner for whole-word occurrences of any number of lowercase keywords.
+    Different keywords may overlap ("medicare" inside "medicare advantage"), but each
+    keyword's own occurrences do not, as with one re.findall per keyword ("la la" is
+    found once in "la la la")
+    """
+    
+    def __init__(self, keywords):
+        self.keywords = sorted(set(keywords))
+        # The longest keyword starting at an offset. A leading \b would keep the regex
+        # engine from skipping ahead to the keywords' first characters, so the start
+        # boundary is checked on each candidate instead
+        self.pattern = re.compile(_trie_pattern(self.keywords, end=r'\b'))
+        # Shorter keywords that match at the same offset are exactly the prefixes of the
+        # longest one that end on a word boundary inside it
+        self.prefixes = {
+            keyword: [other for other in self.keywords
+                      if len(other) < len(keyword) and keyword.startswith(other) and _word_boundary(keyword, len(other))]
+            for keyword in self.keywords
         }
-        self.detailed_corrections = []
-        self.corrections_by_category = defaultdict(int)
-        self.rules = self._load_mvp_rules()
-        self.medicare_checks = []
+    
+    def finditer(self, text):
+        """Yield (keyword, start) for every keyword occurrence in lowercase text, in order of start"""
+        search = self.pattern.search
+        word = WORD_CHARACTER.match
+        # Where each keyword's last occurrence ends; an occurrence starting before that overlaps it
+        ends = {}
+        position = 0
+        while True:
+            match = search(text, position)
+            if match is None:
+                return
+            start = match.start()
+            # Resume just past the start, so keywords starting inside this one are found too
+            position = start + 1
+            if (start > 0 and word(text, start - 1) is not None) == (word(text, start) is not None):
+                continue
+            keyword = match.group()
+            for found in (keyword, *self.prefixes[keyword]):
+                if start >= ends.get(found, 0):
+                    ends[found] = start + len(found)
+                    yield found, start
+    
+    def find_in_paragraphs(self, texts):
+        """Yield (keyword, paragraph, start) for every keyword occurrence in texts of any case
+
+        Offsets are into the original texts, also where lower() changes a paragraph's
+        length ('İ' lowers to two characters).
+        """
+        for i, text in enumerate(texts):
+            lowered = text.lower()
+            if len(lowered) == len(text):
+                for keyword, start in self.finditer(lowered):
+                    yield keyword, i, start
+                continue
+            # Offset in text of each character of lowered
+            origins = [j for j, char in enumerate(text) for _ in char.lower()]
+            for keyword, start in self.finditer(lowered):
+                yield keyword, i, origins[start]
+
+@lru_cache(maxsize=64)
+def keyword_scanner(keywords):
+    """KeywordScanner for a tuple of keywords, compiled once per keyword set"""
+    return KeywordScanner(keywords)
+
+# Medicare compliance findings, matched together in one scan of the document text.
+# Neither kind can start inside the other: CMS codes hold no word boundaries and
+# phone numbers hold no Y, so the alternation finds exactly what each pattern would.
+# The leading lookahead lets the scan skip to characters either kind can start with.
+MEDICARE_CHECK_PATTERN = re.compile(
+    r'(?=[Y(\d])(?:'
+    r'(?P<cms_code>\bY[A-Z0-9]*_[A-Z0-9]*_[A-Z0-9]*\b)'
+    r'|\b(?P<phone_missing_tty>\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4})\b(?!\s*\(TTY 711\))'
+    r')'
+)
+
+# Package parts besides the body that hold document text, in the order they are walked
+TEXT_PART_KINDS = OrderedDict([
+    (RT.HEADER, 'header'),
+    (RT.FOOTER, 'footer'),
+    (RT.FOOTNOTES, 'footnotes'),
+    (RT.ENDNOTES, 'endnotes'),
+])
+
+# Every paragraph in a part in document order: table cells at any depth, content
+# controls and text boxes included. Text boxes saved with a legacy VML fallback hold
+# a second copy of their text, which is skipped so it is not corrected or counted twice.
+TEXT_PARAGRAPHS = etree.XPath(
+    './/w:p[not(ancestor::mc:Fallback)]',
+    namespaces={'w': nsmap['w'], 'mc': 'http://schemas.openxmlformats.org/markup-compatibility/2006'}
+)
+
+def iter_text_parts(doc):
+    """Yield (kind, part, element) for the body and each header, footer, footnotes and endnotes part
+
+    python-docx only keeps footnotes and endnotes as bytes, so those are parsed here
+    and element is not the part's own; DocumentIndex.write_back saves changes to them.
+    """
+    yield 'body', doc.part, doc.element.body
+    
+    rels = [rel for rel in doc.part.rels.values() if not rel.is_external]
+    for reltype, kind in TEXT_PART_KINDS.items():
+        # Sections can share a header or footer part, so each part is walked once
+        parts = {rel.target_part for rel in rels if rel.reltype == reltype}
+        for part in sorted(parts, key=lambda part: part.partname):
+            element = part.element if isinstance(part, XmlPart) else parse_xml(part.blob)
+            yield kind, part, element
+
+W_R = qn('w:r')
+W_RPR = qn('w:rPr')
+W_T = qn('w:t')
+W_TAB = qn('w:tab')
+W_BREAKS = (qn('w:br'), qn('w:cr'))
+XML_SPACE = qn('xml:space')
+RUN_CONTENT_CHARACTERS = re.compile(r'[\t\r\n]')
+
+def xml_run_text(r):
+    """Text of a w:r element, exactly as python-docx's Run.text reads it but without proxies"""
+    text = ''
+    for child in r:
+        tag = child.tag
+        if tag == W_T:
+            text += child.text or ''
+        elif tag == W_TAB:
+            text += '\t'
+        elif tag in W_BREAKS:
+            text += '\n'
+    return text
+
+def set_xml_run_text(r, text):
+    """Set the text of a w:r element with the same resulting XML as python-docx's Run.text setter
+
+    A run holding just one w:t (after any w:rPr) is updated in place; anything else,
+    or text that needs w:tab or w:br elements, goes through python-docx.
+    """
+    content = r[1:] if len(r) and r[0].tag == W_RPR else r[:]
+    if len(content) != 1 or content[0].tag != W_T or RUN_CONTENT_CHARACTERS.search(text):
+        r.text = text
+        return
+    
+    t = content[0]
+    if not text:
+        r.remove(t)
+        return
+    t.attrib.clear()
+    t.text = text
+    if len(text.strip()) < len(text):
+        t.set(XML_SPACE, 'preserve')
+
+class DocumentIndex:
+    """
+    Paragraph texts, text marker ranges and text offsets for a document,
+    collected in a single traversal and kept current as runs are rewritten
+
+    Body paragraphs come first, in reading order, followed by those of headers,
+    footers, footnotes and endnotes. Text markers are only looked for in the body.
+    """
+    
+    def __init__(self, doc):
+        self.doc = doc
+        self.elements = []
+        self.paragraphs = []
+        self.kinds = []
+        self.parts = []
+        self.modified_parts = set()
+        self._detached = {}
+        
+        for kind, part, element in iter_text_parts(doc):
+            first = len(self.paragraphs)
+            self.elements.extend(TEXT_PARAGRAPHS(element))
+            self.paragraphs.extend(Paragraph(p, None) for p in self.elements[first:])
+            self.kinds.extend([kind] * (len(self.paragraphs) - first))
+            self.parts.extend([part] * (len(self.paragraphs) - first))
+            if kind == 'body':
+                self.body_count = len(self.paragraphs)
+            elif element is not getattr(part, 'element', None):
+                self._detached[part] = element
+        
+        self.texts = [para.text for para in self.paragraphs]
+        self._ranges = {}
+        self._offsets = None
+        self._text = None
+    
+    def find_range(self, start_marker, end_marker):
+        """Find paragraph range between text markers (not Word bookmarks)"""
+        key = (start_marker, end_marker)
+        if key not in self._ranges:
+            start_para = None
+            end_para = None
+            start_lower = start_marker.lower()
+            end_lower = end_marker.lower()
+            
+            for i, text in enumerate(self.texts[:self.body_count]):
+                para_text = text.strip().lower()
+                
+                # Check if paragraph contains start marker
+                if start_lower in para_text:
+                    start_para = i
+                    logger.debug("📍 Found marker '%s' at paragraph %d", start_marker, i)
+                
+                # Check if paragraph contains end marker
+                if end_lower in para_text:
+                    end_para = i
+                    logger.debug("📍 Found marker '%s' at paragraph %d", end_marker, i)
+                    break  # Stop searching after finding end marker
+            
+            self._ranges[key] = (start_para, end_para)
+        return self._ranges[key]
+    
+    def paragraph_indexes(self, start_para, end_para):
+        """Indexes of the paragraphs in a marker range, or of all paragraphs if it was not found
+
+        Headers, footers and notes sit outside the body's marker flow and are always included.
+        """
+        if start_para is None or end_para is None:
+            return range(len(self.texts))
+        return [*range(start_para, min(end_para + 1, self.body_count)), *range(self.body_count, len(self.texts))]
+    
+    @property
+    def offsets(self):
+        """Start offset of each paragraph in the document text joined with newlines"""
+        if self._offsets is None:
+            offsets = []
+            position = 0
+            for text in self.texts:
+                offsets.append(position)
+                position += len(text) + 1
+            self._offsets = offsets
+        return self._offsets
+    
+    @property
+    def text(self):
+        """The document text: every paragraph's text joined with newlines"""
+        if self._text is None:
+            self._text = '\n'.join(self.texts)
+        return self._text
+    
+    def locate(self, position):
+        """(paragraph, offset within it) of a position in the joined document text"""
+        offsets = self.offsets
+        i = bisect_right(offsets, position) - 1
+        return i, position - offsets[i]
+    
+    def update_paragraph(self, i, text=None):
+        """Refresh a paragraph after its runs were rewritten, optionally with its known new text"""
+        if text is None:
+            text = self.paragraphs[i].text
+        if text != self.texts[i]:
+            # Marker ranges only move when a body paragraph gains or loses a marker
+            if i < self.body_count:
+                before = self.texts[i].lower()
+                after = text.lower()
+                if any(marker.lower() in before or marker.lower() in after
+                       for markers in self._ranges for marker in markers):
+                    self._ranges = {}
+            self.texts[i] = text
+            self._offsets = None
+            self._text = None
+            self.modified_parts.add(self.parts[i])
+    
+    def write_back(self):
+        """Serialize rewritten footnotes and endnotes back into their parts before saving"""
+        for part in self.modified_parts:
+            if part in self._detached:
+                part._blob = serialize_part_xml(self._detached[part])
+
+class CorrectionRecord:
+    """
+    One rule hit: where it happened and the fragment it replaced, not the whole paragraph
+    """
+    __slots__ = ('category', 'rule', 'paragraph', 'start', 'original', 'replacement')
+    
+    def __init__(self, category, rule, paragraph, start, original, replacement):
+        self.category = category
+        self.rule = rule
+        self.paragraph = paragraph
+        self.start = start
+        self.original = original
+        self.replacement = replacement
+    
+    def to_dict(self):
+        return {
+            'category': self.category,
+            'rule': self.rule,
+            'paragraph': self.paragraph,
+            'start': self.start,
+            'original': self.original,
+            'replacement': self.replacement
+        }
+
+class CorrectionLog:
+    """
+    Compact log of rule hits for a document. The full before/after text of a paragraph
+    is rebuilt on demand by replaying its hits backwards from the paragraph's final text.
+    """
+    
+    def __init__(self, index):
+        self.index = index
+        self.records = []
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def __iter__(self):
+        return iter(self.records)
+    
+    def add(self, category, rule, paragraph, before, after, edits):
+        """Record a hit from the window between the first and last of the rule's edits to before"""
+        start = edits[0][0]
+        end_before = edits[-1][1]
+        end_after = end_before + len(after) - len(before)
+        self.records.append(CorrectionRecord(
+            category, rule, paragraph, start, before[start:end_before], after[start:end_after]))
+    
+    def rows(self, limit=None):
+        """Rebuild full paragraph text before and after each of the first `limit` hits"""
+        records = self.records if limit is None else self.records[:limit]
+        wanted = {record.paragraph for record in records}
+        
+        # Every hit on a wanted paragraph is needed to walk back from its final text
+        hits_by_paragraph = defaultdict(list)
+        for position, record in enumerate(self.records):
+            if record.paragraph in wanted:
+                hits_by_paragraph[record.paragraph].append((position, record))
+        
+        texts = {}
+        for paragraph, hits in hits_by_paragraph.items():
+            text = self.index.texts[paragraph]
+            for position, record in reversed(hits):
+                before = text[:record.start] + record.original + text[record.start + len(record.replacement):]
+                texts[position] = (before, text)
+                text = before
+        
+        return [{
+            'category': record.category,
+            'rule': record.rule,
+            'start': record.start,
+            'original': texts[position][0],
+            'replacement': texts[position][1]
+        } for position, record in enumerate(records)]
+
+class ProcessingContext:
+    """
+    Request-scoped configuration and results for processing a single document
+    """
+    
+    def __init__(self, user_config=None):
+        self.user_config = user_config or {}
         self.keyword_analysis = {}
-        self.user_config = {}
+        self.keyword_details = {}
+        self.medicare_checks = []
+        self.index = None
+        # The processor's rule set when the request first needed it, kept across reloads
+        self.ruleset = None
+        # Optional callback rule_progress(done, total) as the rule pass walks paragraphs
+        self.rule_progress = None
+        # Seconds spent per processing stage, and per rule id [category, matches, seconds]
+        self.started = time.perf_counter()
+        self.timings = {}
+        self.rule_stats = {}
+        # RuleProfile of the rule pass, when profiling was asked for
+        self.profile = None
     
-    def _load_mvp_rules(self):
-        """Load all MVP corporate rules"""
+    @contextlib.contextmanager
+    def timed(self, stage):
+        """Add the time spent in the with block to a stage's timing"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = self.timings.get(stage, 0) + time.perf_counter() - start
+    
+    def add_rule_stats(self, rule_plan, matches, seconds):
+        """Fold a rule pass's per-rule match counts and times (in plan order) into rule_stats"""
+        for rule, rule_matches, rule_seconds in zip(rule_plan, matches, seconds):
+            stats = self.rule_stats.setdefault(rule.rule_id, [rule.category_name, 0, 0])
+            stats[1] += rule_matches
+            stats[2] += rule_seconds
+    
+    def metrics_sample(self):
+        """Timings and sizes of this document, as recorded by record_document_metrics"""
         return {
-            'time_formatting_rules': [
-                {
-                    'category': 'remove_all_unnecessary_minutes',
-                    'find': r'\b(\d{1,2}):00\b',
-                    'replace': r'\1',
-                    'case_sensitive': False,
-                    'description': "Remove all instances of :00 minutes",
-                    'enabled': True
-                },
-                {
-                    'category': 'am_all_variations_lowercase',
-                    'find': r'\b(\d{1,2}(?::\d{2})?)\s*([Aa]\.?[Mm]\.?)\b',
-                    'replace': r'\1 am',
-                    'case_sensitive': False,
-                    'description': "Convert all AM variations to lowercase am",
-                    'enabled': True
-                },
-                {
-                    'category': 'pm_all_variations_lowercase',
-                    'find': r'\b(\d{1,2}(?::\d{2})?)\s*([Pp]\.?[Mm]\.?)\b',
-                    'replace': r'\1 pm',
-                    'case_sensitive': False,
-                    'description': "Convert all PM variations to lowercase pm",
-                    'enabled': True
-                },
-                {
-                    'category': 'time_range_en_dash',
-                    'find': r'\b(\d{1,2}(?::\d{2})?\s*(?:am|pm))\s*[-–—]\s*(\d{1,2}(?::\d{2})?\s*(?:am|pm))\b',
-                    'replace': r'\1–\2',
-                    'case_sensitive': False,
-                    'description': "Use en dash with no spaces for time ranges",
-                    'enabled': True
-                },
-                {
-                    'category': 'space_before_am_pm',
-                    'find': r'\b(\d{1,2}(?::\d{2})?)(am|pm)\b',
-                    'replace': r'\1 \2',
-                    'case_sensitive': False,
-                    'description': "Ensure space between number and am/pm",
-                    'enabled': True
-                }
-            ],
-            'number_formatting_rules': [
-                {
-                    'category': 'spell_out_small_numbers',
-                    'find': r'\b(?<![\d\-/])(?<!January\s)(?<!February\s)(?<!March\s)(?<!April\s)(?<!May\s)(?<!June\s)(?<!July\s)(?<!August\s)(?<!September\s)(?<!October\s)(?<!November\s)(?<!December\s)([1-9])\b(?!\s*(?:[AaPp]\.?[Mm]\.?|am|pm|:\d|%|\.|,\d{3}|-star|th|nd|rd|st)\b)(?![\d\-/])',
-                    'replace': 'NUMBER_WORD_\\1',
-                    'case_sensitive': False,
-                    'description': "Spell out numbers 1-9 (with exclusions)",
-                    'enabled': True
-                },
-                {
-                    'category': 'comma_in_large_numbers',
-                    'find': r'\b(?<!extension\s)(?<!ext\.\s)(?<![-.])\b(?!20[2-5]\d\b)(\d{1,3})(\d{3})\b(?![\d/])',
-                    'replace': r'\1,\2',
-                    'case_sensitive': False,
-                    'description': "Add commas to numbers 1,000+ (excluding years 2020-2050 and phone numbers)",
-                    'enabled': True
-                }
-            ],
-            'brand_trademark_rules': [
-                {
-                    'category': 'gia_registration_mark',
-                    'find': r'\bGia(?!®)\b',
-                    'replace': 'Gia®',
-                    'case_sensitive': True,
-                    'description': "Add registration mark to first instance of Gia",
-                    'first_instance_only': True,
-                    'enabled': True
-                }
-            ],
-            'mvp_terminology_rules': [
-                {
-                    'category': 'mvp_health_plans_to_mvp_health_care_plans',
-                    'find': r'\bMVP health plans\b',
-                    'replace': 'MVP Health Care plans',
-                    'case_sensitive': False,
-                    'description': "Use full company name for plans",
-                    'enabled': True
-                },
-                {
-                    'category': 'telehealth_to_virtual_care',
-                    'find': r'\btelehealth\b',
-                    'replace': 'virtual care',
-                    'case_sensitive': False,
-                    'description': "Use virtual care for member communications",
-                    'enabled': True
-                },
-                {
-                    'category': 'healthcare_terminology',
-                    'find': r'\bhealthcare\b',
-                    'replace': 'health care',
-                    'case_sensitive': False,
-                    'description': "Always use 'health care' (two words)",
-                    'enabled': True
-                },
-                {
-                    'category': 'login_to_signin',
-                    'find': r'\blogin\b',
-                    'replace': 'sign in',
-                    'case_sensitive': False,
-                    'description': "Replace 'login' with 'sign in'",
-                    'enabled': True
-                },
-                {
-                    'category': 'log_in_to_sign_in',
-                    'find': r'\blog in\b(?!\s+to)',
-                    'replace': 'sign in',
-                    'case_sensitive': False,
-                    'description': "Replace 'log in' with 'sign in'",
-                    'enabled': True
-                },
-                {
-                    'category': 'preventative_to_preventive',
-                    'find': r'\bpreventative\b',
-                    'replace': 'preventive',
-                    'case_sensitive': False,
-                    'description': "Use 'preventive' instead of 'preventative'",
-                    'enabled': True
-                }
-            ],
-            'punctuation_rules': [
-                {
-                    'category': 'ampersand_replacement',
-                    'find': r'\s&\s',
-                    'replace': ' and ',
-                    'case_sensitive': False,
-                    'description': "Replace ampersands with 'and'",
-                    'enabled': True
-                },
-                {
-                    'category': 'double_spaces',
-                    'find': r'  +',
-                    'replace': ' ',
-                    'case_sensitive': False,
-                    'description': "Remove multiple spaces",
-                    'enabled': True
-                }
-            ],
-            'state_abbreviation_rules': [
-                {
-                    'category': 'remove_periods_from_states',
-                    'find': r'\b([NnVvCc])\.([YyTt])\.\b',
-                    'replace': r'\1\2',
-                    'case_sensitive': False,
-                    'description': "Remove periods from state abbreviations (NY, VT, CT only)",
-                    'enabled': True
-                },
-                {
-                    'category': 'capitalize_state_abbreviations',
-                    'find': r'\b(ny|vt|ct)\b',
-                    'replace': lambda m: m.group(1).upper(),
-                    'case_sensitive': False,
-                    'description': "Capitalize state abbreviations (NY, VT, CT only)",
-                    'enabled': True,
-                    'is_function': True
-                }
-            ],
-            'medicare_rules': [
-                {
-                    'category': 'add_tty_to_phone_numbers',
-                    'find': r'\b(\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4})\b(?!\s*\(TTY 711\))',
-                    'replace': r'\1 (TTY 711)',
-                    'case_sensitive': False,
-                    'description': "Add (TTY 711) after phone numbers for Medicare pages",
-                    'enabled': False  # Will be enabled when is_medicare_page = True
-                }
-            ]
+            'duration': time.perf_counter() - self.started,
+            'stages': dict(self.timings),
+            'rules': {rule_id: list(stats) for rule_id, stats in self.rule_stats.items()},
+            'paragraphs': len(self.index.texts) if self.index is not None else None
         }
     
-    def _extract_protected_content(self, text):
-        """Extract and preserve content in brackets and URLs"""
-        all_placeholders = {}
-        counter = 0
-        
-        # Extract angle brackets
-        angle_bracket_pattern = r'<[^>]*>'
-        def extract_angle_bracket(match):
-            nonlocal counter
-            placeholder = f"PROTECTED_CONTENT_{counter}"
-            counter += 1
-            all_placeholders[placeholder] = match.group(0)
-            return placeholder
-        
-        text = re.sub(angle_bracket_pattern, extract_angle_bracket, text)
-        
-        # Extract square brackets
-        square_bracket_pattern = r'\[[^\]]*\]'
-        def extract_square_bracket(match):
-            nonlocal counter
-            placeholder = f"PROTECTED_CONTENT_{counter}"
-            counter += 1
-            all_placeholders[placeholder] = match.group(0)
-            return placeholder
-        
-        text = re.sub(square_bracket_pattern, extract_square_bracket, text)
-        
-        # Extract URLs - comprehensive pattern
-        url_patterns = [
-            r'https?://[^\s]+',  # http:// and https:// URLs
-            r'www\.[^\s]+',      # www. URLs
-            r'\b[a-zA-Z0-9.-]+\.(com|org|gov|edu|net|mil|int|biz|info|name|museum|coop|aero|jobs|mobi|travel|tel|cat|asia|xxx|post|mail|corp|home|tv|cc|co|io|ly|me|us|uk|ca|au|de|fr|jp|cn|in|br|mx|es|it|nl|se|no|dk|fi|pl|be|ch|at|ie|pt|gr|cz|hu|ro|bg|hr|si|sk|lt|lv|ee|mt|cy|lu|is|li|ad|mc|sm|va|ma|dz|tn|eg|ly|sd|so|dj|er|et|ke|ug|tz|rw|bi|mw|zm|zw|bw|sz|ls|za|na|mg|mu|sc|km|yt|re|mz|ao|cd|cg|cm|cf|td|ne|ng|bj|tg|gh|ci|lr|sl|gn|gw|gm|sn|ml|bf|mr|cv|st|gq|ga|co|ve|gy|sr|br|pe|ec|bo|py|uy|ar|cl|fk|gs)\b[^\s]*',  # domain.tld patterns
-        ]
-        
-        for pattern in url_patterns:
-            def extract_url(match):
-                nonlocal counter
-                placeholder = f"PROTECTED_CONTENT_{counter}"
-                counter += 1
-                all_placeholders[placeholder] = match.group(0)
-                return placeholder
-            
-            text = re.sub(pattern, extract_url, text, flags=re.IGNORECASE)
-        
-        return text, all_placeholders
-    
-    def _restore_protected_content(self, text, protected_placeholders):
-        """Restore all protected content from placeholders"""
-        for placeholder, original_content in protected_placeholders.items():
-            text = text.replace(placeholder, original_content)
-        return text
-    
-    def _find_bookmark_range(self, doc, start_bookmark="start_page_copy", end_bookmark="end_page_copy"):
-        """Find paragraph range between text markers (not Word bookmarks)"""
-        start_para = None
-        end_para = None
+    @property
+    def is_medicare_page(self):
+        return bool(self.user_config.get('is_medicare_page'))
+    
+    @property
+    def profiling(self):
+        return bool(self.user_config.get('profile'))
+    
+    @property
+    def report_format(self):
+        return self.user_config.get('report') or 'append'
+
+class RuleProfile:
+    """
+    Opt-in profile of a document's rule pass: calls, matches and wall time for every
+    rule and every protected-content pattern. Each protected pattern is also run on its
+    own over every paragraph, so the cost of each can be told apart within the single
+    combined scan the rule pass actually makes.
+    """
+    
+    def __init__(self, scanner):
+        self.scanner = scanner
+        self.compiled_patterns = OrderedDict((name, re.compile(pattern, re.IGNORECASE))
+                                             for name, pattern in scanner.patterns.items())
+        # rule id -> [calls, matches]; seconds and replacements are in ProcessingContext.rule_stats
+        self.rules = defaultdict(lambda: [0, 0])
+        # The combined scan and each pattern alone: [calls, matches, seconds]
+        self.scan = [0, 0, 0.0]
+        self.patterns = OrderedDict((name, [0, 0, 0.0]) for name in scanner.patterns)
+    
+    def find_spans(self, text):
+        """The scanner's protected spans for text, timing the scan and each pattern alone"""
+        clock = time.perf_counter
+        start = clock()
+        spans = self.scanner.find_spans(text)
+        self.scan[2] += clock() - start
+        self.scan[0] += 1
+        self.scan[1] += len(spans)
         
-        # Search for text strings in paragraph content
-        for i, para in enumerate(doc.paragraphs):
-            para_text = para.text.strip().lower()
-            
-            # Check if paragraph contains start marker
-            if start_bookmark.lower() in para_text:
-                start_para = i
-                print(f"📍 Found start marker '{start_bookmark}' at paragraph {i}")
+        for name, pattern in self.compiled_patterns.items():
+            start = clock()
+            found = sum(1 for _ in pattern.finditer(text))
+            stats = self.patterns[name]
+            stats[2] += clock() - start
+            stats[0] += 1
+            stats[1] += found
+        return spans
+    
+    def add_rule(self, rule, calls, matches):
+        """Count one rule's pattern searches (one per unprotected segment) and matches in a paragraph"""
+        stats = self.rules[rule.rule_id]
+        stats[0] += calls
+        stats[1] += matches
+    
+    def to_dict(self, rule_stats):
+        """The profile as JSON-serializable data, most expensive first"""
+        rules = []
+        categories = OrderedDict()
+        for rule_id, (category, replacements, seconds) in rule_stats.items():
+            calls, matches = self.rules.get(rule_id, (0, 0))
+            rules.append({'rule': rule_id, 'category': category, 'calls': calls, 'matches': matches,
+                          'replacements': replacements, 'seconds': seconds})
+            totals = categories.setdefault(category, {'category': category, 'calls': 0, 'matches': 0,
+                                                      'replacements': 0, 'seconds': 0})
+            for field in ('calls', 'matches', 'replacements', 'seconds'):
+                totals[field] += rules[-1][field]
+        
+        by_time = lambda stats: stats['seconds']
+        return {
+            'rules': sorted(rules, key=by_time, reverse=True),
+            'categories': sorted(categories.values(), key=by_time, reverse=True),
+            'protected_scan': dict(zip(('calls', 'matches', 'seconds'), self.scan)),
+            'protected_patterns': sorted(
+                ({'pattern': name, **dict(zip(('calls', 'matches', 'seconds'), stats))}
+                 for name, stats in self.patterns.items()), key=by_time, reverse=True)
+        }
+
+ZIP_LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+ZIP_CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+ZIP_END_RECORD = struct.Struct('<IHHHHIIH')
+ZIP_UTF8_FLAG = 0x800
+
+class PassthroughZipWriter:
+    """
+    Minimal zip writer whose entries are either new data, deflated here, or
+    another zip's entries copied byte for byte without decompressing them
+    """
+    
+    def __init__(self, fp):
+        self.fp = fp
+        self.central_directory = []
+    
+    def _write_entry(self, name, method, date_time, crc, compressed, size):
+        try:
+            encoded_name = name.encode('ascii')
+            flags = 0
+        except UnicodeEncodeError:
+            encoded_name = name.encode('utf-8')
+            flags = ZIP_UTF8_FLAG
+        year, month, day, hour, minute, second = date_time
+        dos_date = (year - 1980) << 9 | month << 5 | day
+        dos_time = hour << 11 | minute << 5 | second // 2
+        
+        offset = self.fp.tell()
+        self.fp.write(ZIP_LOCAL_HEADER.pack(
+            0x04034b50, 20, flags, method, dos_time, dos_date, crc,
+            len(compressed), size, len(encoded_name), 0))
+        self.fp.write(encoded_name)
+        self.fp.write(compressed)
+        self.central_directory.append(ZIP_CENTRAL_HEADER.pack(
+            0x02014b50, 20, 20, flags, method, dos_time, dos_date, crc,
+            len(compressed), size, len(encoded_name), 0, 0, 0, 0, 0, offset) + encoded_name)
+    
+    def write(self, name, data):
+        """Add an entry with new contents, deflated like python-docx saves them"""
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        self._write_entry(name, zipfile.ZIP_DEFLATED, time.localtime()[:6],
+                          zlib.crc32(data), compressed, len(data))
+    
+    def copy(self, source_fp, info):
+        """Add an entry of the zip open on source_fp exactly as it was compressed there"""
+        source_fp.seek(info.header_offset)
+        header = source_fp.read(ZIP_LOCAL_HEADER.size)
+        name_length, extra_length = ZIP_LOCAL_HEADER.unpack(header)[-2:]
+        source_fp.seek(info.header_offset + ZIP_LOCAL_HEADER.size + name_length + extra_length)
+        compressed = source_fp.read(info.compress_size)
+        self._write_entry(info.filename, info.compress_type, info.date_time,
+                          info.CRC, compressed, info.file_size)
+    
+    def close(self):
+        offset = self.fp.tell()
+        for record in self.central_directory:
+            self.fp.write(record)
+        size = self.fp.tell() - offset
+        count = len(self.central_directory)
+        self.fp.write(ZIP_END_RECORD.pack(0x06054b50, 0, 0, count, count, size, offset, 0))
+
+def save_document(doc, source, output_file, modified_parts):
+    """Save doc, rewriting only modified_parts and copying every other entry of source raw
+
+    source is the path or file-like the document was loaded from. Images, fonts,
+    styles and unchanged headers keep their original compressed bytes, so saving costs
+    what the edited parts cost. When parts were added since loading, the package
+    manifest changes too and python-docx saves the whole document instead.
+    """
+    package = doc.part.package
+    parts = {part.partname.membername: part for part in package.iter_parts()}
+    rels_of = {part.partname.rels_uri.membername: part for part in parts.values()}
+    
+    with open(source, 'rb') if isinstance(source, (str, os.PathLike)) else contextlib.nullcontext(source) as source_fp:
+        source_fp.seek(0)
+        with zipfile.ZipFile(source_fp) as source_zip:
+            entries = source_zip.infolist()
+        
+        if not set(parts) <= {info.filename for info in entries}:
+            doc.save(output_file)
+            return
+        
+        with open(output_file, 'wb') if isinstance(output_file, (str, os.PathLike)) else contextlib.nullcontext(output_file) as output_fp:
+            writer = PassthroughZipWriter(output_fp)
+            written_rels = set()
+            for info in entries:
+                name = info.filename
+                if name in parts:
+                    part = parts[name]
+                    if part in modified_parts:
+                        writer.write(name, part.blob)
+                    else:
+                        writer.copy(source_fp, info)
+                elif name in rels_of:
+                    part = rels_of[name]
+                    written_rels.add(part)
+                    if part not in modified_parts:
+                        writer.copy(source_fp, info)
+                    elif len(part.rels):
+                        writer.write(name, part.rels.xml)
+                elif name in ('[Content_Types].xml', '_rels/.rels'):
+                    writer.copy(source_fp, info)
             
-            # Check if paragraph contains end marker
-            if end_bookmark.lower() in para_text:
-                end_para = i
-                print(f"📍 Found end marker '{end_bookmark}' at paragraph {i}")
-                break  # Stop searching after finding end marker
+            # A modified part may have gained its first relationships
+            for part in modified_parts - written_rels:
+                if len(part.rels):
+                    writer.write(part.partname.rels_uri.membername, part.rels.xml)
+            writer.close()
+
+# Report output choices: appended to the processed document, a separate file, or none
+REPORT_FORMATS = ('append', 'docx', 'json', 'html', 'none')
+REPORT_CORRECTION_LIMIT = 50  # Rows in the detailed changes table
+REPORT_POSITION_LIMIT = 20  # Occurrences listed per Medicare compliance finding
+REPORT_PROFILE_LIMIT = 10  # Slowest rules listed in the rule profile
+
+def report_blocks(report):
+    """Lay out report data as blocks shared by the .docx and HTML renderers
+
+    Blocks are ('heading', text, level, centered), ('paragraph', runs, centered) with
+    runs of (text, bold, italic), and ('table', header, rows).
+    """
+    def labelled(label, text):
+        return ('paragraph', [(label, True, False), (text, False, False)], False)
+    
+    def heading(text):
+        return ('heading', text, 2, False)
+    
+    config = report['configuration']
+    stats = report['statistics']
+    generated = datetime.datetime.fromisoformat(report['generated'])
+    
+    blocks = [
+        ('heading', report['title'], 1, True),
+        ('paragraph', [(f"Generated: {generated.strftime('%B %d, %Y at %I:%M %p')}", False, True)], True),
+        heading('Executive Summary'),
+        labelled('Processing Configuration: ',
+                 f"Target: {config['target_word_count'] or 'Not specified'} words, "
+                 f"Reading Level: {config['target_reading_level'] or 'Not specified'}, "
+                 f"Medicare Page: {'Yes' if config['is_medicare_page'] else 'No'}")
+    ]
+    
+    # Document structure analysis
+    if report['content_range']:
+        structure_text = "Main content area found (paragraphs {}-{}). ".format(*report['content_range'])
+    else:
+        structure_text = "No content markers found, processed entire document. "
+    if report['disclaimer_range']:
+        structure_text += "Disclaimer section found (paragraphs {}-{}).".format(*report['disclaimer_range'])
+    else:
+        structure_text += "No disclaimer section found."
+    blocks.append(labelled('Document Structure: ', structure_text))
+    
+    blocks.append(labelled('Document Statistics: ',
+                           f"{stats['word_count']:,} words • "
+                           f"{stats['sentence_count']} sentences • "
+                           f"Grade {stats['reading_level']:.1f} reading level • "
+                           f"{report['total_corrections']} corrections applied"))
+    
+    # Word Count Analysis
+    blocks.append(heading('Word Count Analysis'))
+    target_words = config['target_word_count']
+    actual_words = stats['word_count']
+    if target_words:
+        word_diff = actual_words - target_words
+        percentage = (actual_words / target_words) * 100
+        blocks.append(labelled('Target Word Count: ', f"{target_words:,} words"))
+        blocks.append(labelled('Actual Word Count: ', f"{actual_words:,} words ({percentage:.1f}% of target)"))
+        if word_diff > 0:
+            blocks.append(labelled('Difference: ', f"+{word_diff:,} words over target"))
+        elif word_diff < 0:
+            blocks.append(labelled('Difference: ', f"{word_diff:,} words under target"))
+        else:
+            blocks.append(labelled('Difference: ', "Exactly on target"))
+    else:
+        blocks.append(('paragraph', [('No target word count specified. ', False, False),
+                                     (f'Current word count: {actual_words:,} words', True, False)], False))
+    
+    # Reading Level Analysis
+    blocks.append(heading('Reading Level Analysis'))
+    target_level = config['target_reading_level']
+    actual_level = stats['reading_level']
+    if target_level:
+        level_diff = actual_level - target_level
+        blocks.append(labelled('Target Reading Level: ', f"Grade {target_level}"))
+        blocks.append(labelled('Actual Reading Level: ', f"Grade {actual_level:.1f}"))
+        if abs(level_diff) <= 0.5:
+            blocks.append(labelled('Difference: ', "On target"))
+        elif level_diff > 0:
+            blocks.append(labelled('Difference: ', f"{level_diff:+.1f} grades above target"))
+        else:
+            blocks.append(labelled('Difference: ', f"{level_diff:+.1f} grades below target"))
+    else:
+        blocks.append(('paragraph', [('No target reading level specified. ', False, False),
+                                     (f'Current reading level: Grade {actual_level:.1f}', True, False)], False))
+    
+    # Keyword Analysis
+    if report['keyword_analysis']:
+        blocks.append(heading('SEO Keyword Analysis'))
+        for keyword, count in report['keyword_analysis'].items():
+            sections = report.get('keyword_sections', {}).get(keyword)
+            if sections:
+                breakdown = ', '.join(f"{section}: {hits}" for section, hits in sections.items())
+                blocks.append(labelled(f'"{keyword}": ', f"{count} occurrences ({breakdown})"))
+            else:
+                blocks.append(labelled(f'"{keyword}": ', f"{count} occurrences"))
+    
+    # Medicare Compliance, with location info
+    if report['medicare_checks']:
+        blocks.append(heading('Medicare Compliance Check'))
+        for check in report['medicare_checks']:
+            blocks.append(labelled(f"{check['type'].replace('_', ' ').title()}: ", check['description']))
+            if 'location' in check:
+                blocks.append(labelled('Location: ', check['location']))
+            if check.get('positions'):
+                positions = '; '.join(f"paragraph {position['paragraph']}, character {position['start']}: {position['text']}"
+                                      for position in check['positions'][:REPORT_POSITION_LIMIT])
+                more = len(check['positions']) - REPORT_POSITION_LIMIT
+                if more > 0:
+                    positions += f"; ... and {more} more"
+                blocks.append(labelled('Positions: ', positions))
+    
+    # Document Structure Guide
+    if config['is_medicare_page']:
+        blocks.append(heading('Document Structure Guide'))
+        blocks.append(('paragraph', [('For optimal Medicare compliance, use these text markers in your document:', True, False)], False))
+        for marker in ('start_page_copy - Begin main content processing',
+                       'end_page_copy - End main content processing',
+                       'start_disclaimer - Begin disclaimer section (for CMS code placement)',
+                       'end_disclaimer - End disclaimer section'):
+            blocks.append(('paragraph', [(f"• {marker}", False, False)], False))
+    
+    # Detailed Changes Table
+    if report['detailed_corrections']:
+        blocks.append(heading('Detailed Changes Applied'))
+        blocks.append(('table', ['Category', 'Original Text', 'Corrected Text'], [
+            [correction['rule'].replace('_', ' ').title(), correction['original'], correction['corrected']]
+            for correction in report['detailed_corrections']
+        ]))
+        if report['more_corrections']:
+            blocks.append(('paragraph', [(f"... and {report['more_corrections']} more corrections", False, True)], False))
+    
+    # Corrections by Category
+    if report['corrections_by_category']:
+        blocks.append(heading('Corrections by Category'))
+        for category, count in sorted(report['corrections_by_category'].items(), key=lambda x: x[1], reverse=True):
+            if count > 0:
+                blocks.append(labelled(f"{category.replace('_', ' ').title()}: ", f"{count} corrections"))
+    
+    # Rule Profile, most expensive first
+    profile = report.get('profile')
+    if profile:
+        blocks.append(heading('Rule Profile'))
+        blocks.append(('table', ['Rule', 'Category', 'Calls', 'Matches', 'Time (ms)'], [
+            [stats['rule'], stats['category'], str(stats['calls']), str(stats['matches']), f"{stats['seconds'] * 1000:.2f}"]
+            for stats in profile['rules'][:REPORT_PROFILE_LIMIT]
+        ]))
+        scan = profile['protected_scan']
+        blocks.append(labelled('Protected Content Scan: ',
+                               f"{scan['calls']} calls, {scan['matches']} spans, {scan['seconds'] * 1000:.2f} ms "
+                               "(each pattern alone below)"))
+        blocks.append(('table', ['Pattern', 'Calls', 'Matches', 'Time (ms)'], [
+            [stats['pattern'], str(stats['calls']), str(stats['matches']), f"{stats['seconds'] * 1000:.2f}"]
+            for stats in profile['protected_patterns']
+        ]))
+    
+    return blocks
+
+def _run_xml(text, bold=False, italic=False):
+    """w:r markup for text, with tabs and line breaks as python-docx's Run.text writes them"""
+    properties = ('<w:b/>' if bold else '') + ('<w:i/>' if italic else '')
+    parts = ['<w:r>']
+    if properties:
+        parts.append(f'<w:rPr>{properties}</w:rPr>')
+    for piece in re.split(r'([\t\r\n])', text):
+        if piece == '\t':
+            parts.append('<w:tab/>')
+        elif piece in ('\r', '\n'):
+            parts.append('<w:br/>')
+        elif piece:
+            space = ' xml:space="preserve"' if len(piece.strip()) < len(piece) else ''
+            parts.append(f'<w:t{space}>{html.escape(piece, quote=False)}</w:t>')
+    parts.append('</w:r>')
+    return ''.join(parts)
+
+def _paragraph_xml(runs, style_id=None, centered=False):
+    properties = (f'<w:pStyle w:val="{style_id}"/>' if style_id else '') + ('<w:jc w:val="center"/>' if centered else '')
+    return ''.join([
+        '<w:p>',
+        f'<w:pPr>{properties}</w:pPr>' if properties else '',
+        *(_run_xml(*run) for run in runs),
+        '</w:p>'
+    ])
+
+def append_report(doc, report, page_break=True):
+    """Append the report to the end of doc's body
+
+    The whole report, tables included, is written as one XML string and parsed once,
+    rather than through python-docx's per-paragraph, per-run and per-cell API.
+    """
+    def style_id(*names):
+        for name in names:
+            try:
+                return doc.styles[name].style_id
+            except KeyError:
+                continue
+        return None
+    
+    heading_styles = {1: style_id('Heading 1'), 2: style_id('Heading 2')}
+    table_style = style_id('Table Grid', 'Light Grid')
+    section = doc.sections[-1]
+    try:
+        block_width = section.page_width - section.left_margin - section.right_margin
+    except TypeError:
+        block_width = Inches(6.5)
+    
+    xml = []
+    if page_break:
+        xml.append('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+    
+    for block in report_blocks(report):
+        if block[0] == 'heading':
+            _, text, level, centered = block
+            xml.append(_paragraph_xml([(text,)], heading_styles[level], centered))
+        elif block[0] == 'paragraph':
+            _, runs, centered = block
+            xml.append(_paragraph_xml(runs, centered=centered))
+        elif block[0] == 'table':
+            _, header, rows = block
+            column_width = int(block_width / len(header) / 635)  # EMU to twentieths of a point
+            cell_properties = f'<w:tcPr><w:tcW w:type="dxa" w:w="{column_width}"/></w:tcPr>'
+            xml.append(''.join([
+                '<w:tbl><w:tblPr>',
+                f'<w:tblStyle w:val="{table_style}"/>' if table_style else '',
+                '<w:tblW w:type="auto" w:w="0"/>',
+                '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" w:noHBand="0" w:noVBand="1" w:val="04A0"/>',
+                '</w:tblPr><w:tblGrid>',
+                f'<w:gridCol w:w="{column_width}"/>' * len(header),
+                '</w:tblGrid>',
+                '<w:tr>', *(f'<w:tc>{cell_properties}{_paragraph_xml([(text, True)])}</w:tc>' for text in header), '</w:tr>',
+                *(''.join(['<w:tr>', *(f'<w:tc>{cell_properties}{_paragraph_xml([(text,)])}</w:tc>' for text in row), '</w:tr>'])
+                  for row in rows),
+                '</w:tbl>'
+            ]))
+    
+    fragment = parse_xml(f'<w:body {nsdecls("w")}>{"".join(xml)}</w:body>')
+    body = doc.element.body
+    section_properties = body.find(qn('w:sectPr'))
+    for element in list(fragment):
+        if section_properties is not None:
+            section_properties.addprevious(element)
+        else:
+            body.append(element)
+
+def render_report_html(report):
+    """Render the report as a standalone HTML page"""
+    parts = [
+        '<!DOCTYPE html>',
+        f'<html><head><meta charset="utf-8"><title>{html.escape(report["title"])}</title>',
+        '<style>body{font-family:Arial,sans-serif;max-width:960px;margin:2em auto;line-height:1.5}'
+        '.center{text-align:center}table{border-collapse:collapse;width:100%}'
+        'th,td{border:1px solid #ccc;padding:4px 8px;text-align:left;vertical-align:top}</style>',
+        '</head><body>'
+    ]
+    
+    for block in report_blocks(report):
+        if block[0] == 'heading':
+            _, text, level, centered = block
+            attributes = ' class="center"' if centered else ''
+            parts.append(f'<h{level}{attributes}>{html.escape(text)}</h{level}>')
+        elif block[0] == 'paragraph':
+            _, runs, centered = block
+            content = []
+            for text, bold, italic in runs:
+                text = html.escape(text)
+                if italic:
+                    text = f'<em>{text}</em>'
+                if bold:
+                    text = f'<strong>{text}</strong>'
+                content.append(text)
+            attributes = ' class="center"' if centered else ''
+            parts.append(f'<p{attributes}>{"".join(content)}</p>')
+        elif block[0] == 'table':
+            _, header, rows = block
+            parts.append('<table><thead><tr>' + ''.join(f'<th>{html.escape(text)}</th>' for text in header) + '</tr></thead><tbody>')
+            for row in rows:
+                parts.append('<tr>' + ''.join(f'<td>{html.escape(text)}</td>' for text in row) + '</tr>')
+            parts.append('</tbody></table>')
+    
+    parts.append('</body></html>')
+    return '\n'.join(parts)
+
+# Overall progress reported by process_document when each stage completes; the rule
+# pass moves from PROGRESS_ANALYZED to PROGRESS_CORRECTED in RULE_PROGRESS_UPDATES steps
+PROGRESS_LOADED = 10
+PROGRESS_ANALYZED = 20
+PROGRESS_CORRECTED = 80
+PROGRESS_REPORT = 90
+PROGRESS_SAVED = 95
+RULE_PROGRESS_UPDATES = 20
+
+class MVPDocumentProcessor:
+    """
+    Enhanced MVP Document Processor with user inputs, comprehensive analysis, and disclaimer bookmarks
+
+    The processor only holds the rule set and its compiled plans, which are never
+    modified: reloading the rule packs swaps in a whole new RuleSet, and each request
+    keeps the one it started with. All per-request state lives in a ProcessingContext,
+    so a single instance can safely process many documents concurrently.
+
+    With xml_fast_path the rule pass reads and writes w:r elements directly instead
+    of going through python-docx's proxies; the python-docx path stays the reference
+    implementation and benchmarks/bench_xml_rule_engine.py checks the two agree.
+    """
+    
+    def __init__(self, xml_fast_path=False, passthrough_save=True, rules_dir=DEFAULT_RULES_DIR,
+                 rules_cache_dir=None, reload_interval=None):
+        self.rules_dir = rules_dir
+        self.rules_cache_dir = rules_cache_dir
+        self.ruleset = RuleSet.load(rules_dir, rules_cache_dir)
+        self.span_scanner = ProtectedSpanScanner()
+        self.xml_fast_path = xml_fast_path
+        self.passthrough_save = passthrough_save
         
-        return start_para, end_para
+        # Rule pack changes are looked for at most every reload_interval seconds; None never
+        self.reload_interval = reload_interval
+        self._next_reload_check = time.monotonic() + (reload_interval or 0)
+        self._failed_signature = None
+        self._reload_lock = threading.Lock()
+    
+    @property
+    def rules(self):
+        return self.ruleset.rules
+    
+    @property
+    def rule_plan(self):
+        return self.ruleset.rule_plan
+    
+    @property
+    def medicare_rule_plan(self):
+        return self.ruleset.medicare_rule_plan
+    
+    @property
+    def rules_version(self):
+        return self.ruleset.version
+    
+    def check_rule_packs(self):
+        """Reload the rule packs if they changed on disk, at most once per reload interval
 
-    def _find_disclaimer_range(self, doc, start_disclaimer="start_disclaimer", end_disclaimer="end_disclaimer"):
-        """Find paragraph range between disclaimer markers"""
-        start_para = None
-        end_para = None
+        The new rule set is loaded and compiled before it replaces the current one in
+        a single assignment. A pack that fails to load is reported once and the
+        current rules stay in use. Returns whether the rules were reloaded.
+        """
+        if self.reload_interval is None or time.monotonic() < self._next_reload_check:
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            return False
         
-        # Search for disclaimer markers in paragraph content
-        for i, para in enumerate(doc.paragraphs):
-            para_text = para.text.strip().lower()
+        try:
+            self._next_reload_check = time.monotonic() + self.reload_interval
+            signature = rule_pack_signature(self.rules_dir)
+            if signature in (self.ruleset.signature, self._failed_signature):
+                return False
             
-            # Check if paragraph contains start disclaimer marker
-            if start_disclaimer.lower() in para_text:
-                start_para = i
-                print(f"📍 Found disclaimer start marker '{start_disclaimer}' at paragraph {i}")
+            try:
+                ruleset = RuleSet.load(self.rules_dir, self.rules_cache_dir)
+            except (OSError, RulePackError) as e:
+                self._failed_signature = signature
+                logger.warning("⚠️ Keeping current rules, rule packs failed to load: %s", e)
+                return False
             
-            # Check if paragraph contains end disclaimer marker
-            if end_disclaimer.lower() in para_text:
-                end_para = i
-                print(f"📍 Found disclaimer end marker '{end_disclaimer}' at paragraph {i}")
-                break  # Stop searching after finding end marker
-        
-        return start_para, end_para
+            self.ruleset = ruleset
+            logger.info("🔄 Reloaded rule packs (rules version %s)", ruleset.version)
+            return True
+        except OSError as e:
+            logger.warning("⚠️ Could not check rule packs: %s", e)
+            return False
+        finally:
+            self._reload_lock.release()
+    
+    def _rule_plan_for(self, context):
+        """Select the compiled rule plan for a request, from the rule set it started with"""
+        if context.ruleset is None:
+            context.ruleset = self.ruleset
+        return context.ruleset.medicare_rule_plan if context.is_medicare_page else context.ruleset.rule_plan
     
-    def _check_medicare_compliance(self, doc):
-        """Check Medicare-specific compliance requirements with enhanced disclaimer checking"""
+    def _rule_profile_for(self, context):
+        """The request's RuleProfile if it asked for profiling, otherwise None"""
+        if context.profiling and context.profile is None:
+            context.profile = RuleProfile(self.span_scanner)
+        return context.profile
+    
+    def _document_index(self, doc, context):
+        """Get the request's document index, building it on first use"""
+        if context.index is None or context.index.doc is not doc:
+            context.index = DocumentIndex(doc)
+        return context.index
+    
+    def _find_bookmark_range(self, index, start_bookmark="start_page_copy", end_bookmark="end_page_copy"):
+        """Find paragraph range between text markers (not Word bookmarks)"""
+        return index.find_range(start_bookmark, end_bookmark)
+
+    def _find_disclaimer_range(self, index, start_disclaimer="start_disclaimer", end_disclaimer="end_disclaimer"):
+        """Find paragraph range between disclaimer markers"""
+        return index.find_range(start_disclaimer, end_disclaimer)
+    
+    def _check_medicare_compliance(self, doc, context):
+        """Check Medicare-specific compliance requirements with enhanced disclaimer checking
+
+        CMS codes and phone numbers without TTY 711 are found in one scan of the
+        document text and reported with the paragraph and offset of each occurrence.
+        """
         medicare_issues = []
+        index = self._document_index(doc, context)
         
-        # Get full document text for general checks
-        full_text = ' '.join([p.text for p in doc.paragraphs if p.text.strip()])
+        findings = {'cms_code': [], 'phone_missing_tty': []}
+        for match in MEDICARE_CHECK_PATTERN.finditer(index.text):
+            kind = match.lastgroup
+            paragraph, start = index.locate(match.start(kind))
+            findings[kind].append({'text': match.group(kind), 'paragraph': paragraph, 'start': start})
         
         # Check for CMS code specifically in disclaimer section if Medicare page
-        if self.user_config.get('is_medicare_page'):
+        if context.is_medicare_page:
             # Find disclaimer section
-            disclaimer_start, disclaimer_end = self._find_disclaimer_range(doc)
+            disclaimer_start, disclaimer_end = self._find_disclaimer_range(index)
             
             if disclaimer_start is not None and disclaimer_end is not None:
-                # Get text only from disclaimer section
-                disclaimer_paragraphs = doc.paragraphs[disclaimer_start:disclaimer_end + 1]
-                disclaimer_text = ' '.join([p.text for p in disclaimer_paragraphs if p.text.strip()])
-                
-                print(f"📍 Checking CMS code in disclaimer section (paragraphs {disclaimer_start}-{disclaimer_end})")
-                
-                # Check for CMS code in disclaimer section
-                cms_code_pattern = r'\bY[A-Z0-9]*_[A-Z0-9]*_[A-Z0-9]*\b'
-                cms_codes = re.findall(cms_code_pattern, disclaimer_text)
+                logger.debug("📍 Checking CMS code in disclaimer section (paragraphs %d-%d)", disclaimer_start, disclaimer_end)
+                cms_codes = [finding for finding in findings['cms_code']
+                             if disclaimer_start <= finding['paragraph'] <= disclaimer_end]
+                location = f'Disclaimer section (paragraphs {disclaimer_start}-{disclaimer_end})'
                 
                 if not cms_codes:
                     medicare_issues.append({
                         'type': 'missing_cms_code_in_disclaimer',
                         'description': 'Missing CMS code in disclaimer section (should start with Y and contain two underscores)',
                         'severity': 'high',
-                        'location': f'Disclaimer section (paragraphs {disclaimer_start}-{disclaimer_end})'
+                        'location': location
                     })
                 else:
                     medicare_issues.append({
                         'type': 'cms_code_found_in_disclaimer',
-                        'description': f'CMS code found in disclaimer: {cms_codes[0]}',
+                        'description': f"CMS code found in disclaimer: {cms_codes[0]['text']}",
                         'severity': 'info',
-                        'location': f'Disclaimer section (paragraphs {disclaimer_start}-{disclaimer_end})'
+                        'location': location,
+                        'positions': cms_codes
                     })
             else:
                 # If no disclaimer section found, check entire document
-                print(f"📍 No disclaimer section found, checking entire document for CMS code")
-                cms_code_pattern = r'\bY[A-Z0-9]*_[A-Z0-9]*_[A-Z0-9]*\b'
-                cms_codes = re.findall(cms_code_pattern, full_text)
+                logger.debug("📍 No disclaimer section found, checking entire document for CMS code")
+                cms_codes = findings['cms_code']
                 
                 if not cms_codes:
                     medicare_issues.append({
@@ -374,383 +1602,316 @@ class MVPDocumentProcessor:
                 else:
                     medicare_issues.append({
                         'type': 'cms_code_found',
-                        'description': f'CMS code found: {cms_codes[0]} (Note: Consider placing in disclaimer section)',
+                        'description': f"CMS code found: {cms_codes[0]['text']} (Note: Consider placing in disclaimer section)",
                         'severity': 'info',
-                        'location': 'Document body'
+                        'location': 'Document body',
+                        'positions': cms_codes
                     })
         
         # Check for phone numbers without TTY (in main content area)
-        # Find main content area
-        content_start, content_end = self._find_bookmark_range(doc)
+        content_start, content_end = self._find_bookmark_range(index)
         
         if content_start is not None and content_end is not None:
-            # Check only main content area for phone numbers
-            content_paragraphs = doc.paragraphs[content_start:content_end + 1]
-            content_text = ' '.join([p.text for p in content_paragraphs if p.text.strip()])
-            
-            phone_pattern = r'\b(\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4})\b(?!\s*\(TTY 711\))'
-            phone_matches = re.findall(phone_pattern, content_text)
+            # Check only main content area (plus headers, footers and notes) for phone numbers
+            content = set(index.paragraph_indexes(content_start, content_end))
+            phones = [finding for finding in findings['phone_missing_tty'] if finding['paragraph'] in content]
             
-            if phone_matches:
+            if phones:
                 medicare_issues.append({
                     'type': 'phone_missing_tty_in_content',
-                    'description': f'Found {len(phone_matches)} phone number(s) without TTY 711 in main content area',
+                    'description': f'Found {len(phones)} phone number(s) without TTY 711 in main content area',
                     'severity': 'medium',
-                    'phone_numbers': phone_matches,
-                    'location': f'Main content area (paragraphs {content_start}-{content_end})'
+                    'phone_numbers': [phone['text'] for phone in phones],
+                    'location': f'Main content area (paragraphs {content_start}-{content_end})',
+                    'positions': phones
                 })
         else:
             # Check entire document if no content markers found
-            phone_pattern = r'\b(\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4})\b(?!\s*\(TTY 711\))'
-            phone_matches = re.findall(phone_pattern, full_text)
+            phones = findings['phone_missing_tty']
             
-            if phone_matches:
+            if phones:
                 medicare_issues.append({
                     'type': 'phone_missing_tty',
-                    'description': f'Found {len(phone_matches)} phone number(s) without TTY 711',
+                    'description': f'Found {len(phones)} phone number(s) without TTY 711',
                     'severity': 'medium',
-                    'phone_numbers': phone_matches,
-                    'location': 'Entire document'
+                    'phone_numbers': [phone['text'] for phone in phones],
+                    'location': 'Entire document',
+                    'positions': phones
                 })
         
         return medicare_issues
     
-    def _analyze_keywords(self, text, keywords):
-        """Analyze keyword frequency in text"""
-        keyword_analysis = {}
-        text_lower = text.lower()
+    def _analyze_keywords(self, doc, context):
+        """Count and locate the configured keywords in one scan of every paragraph
+
+        Returns, per keyword, the count over the text the statistics cover (main content
+        plus headers, footers and notes), hits per section and the paragraph and offset of
+        each hit. Sections are 'content', 'disclaimer', the part kind outside the body, and
+        'other' for body text outside both marker ranges.
+        """
+        keywords = [keyword.strip() for keyword in context.user_config.get('keywords', []) if keyword.strip()]
+        keyword_details = {keyword: {'count': 0, 'sections': {}, 'positions': []} for keyword in keywords}
+        if not keywords:
+            return keyword_details
+        
+        # Keywords are matched case-insensitively; differently cased duplicates share hits
+        by_lower = defaultdict(list)
+        for keyword in keyword_details:
+            by_lower[keyword.lower()].append(keyword)
+        scanner = keyword_scanner(tuple(by_lower))
+        
+        index = self._document_index(doc, context)
+        content_start, content_end = self._find_bookmark_range(index)
+        disclaimer_start, disclaimer_end = self._find_disclaimer_range(index)
+        counted = set(index.paragraph_indexes(content_start, content_end))
+        
+        def section_of(i):
+            if i >= index.body_count:
+                return index.kinds[i]
+            if disclaimer_start is not None and disclaimer_end is not None and disclaimer_start <= i <= disclaimer_end:
+                return 'disclaimer'
+            return 'content' if i in counted else 'other'
+        
+        # One scan over the whole document; paragraphs are joined with newlines, which no
+        # keyword spans, and each hit is mapped back to its paragraph by offset. Lowercasing
+        # a few characters changes their length and would shift those offsets, so text
+        # holding them is scanned paragraph by paragraph instead
+        lowered = index.text.lower()
+        if len(lowered) == len(index.text):
+            hits = ((keyword_lower, *index.locate(position)) for keyword_lower, position in scanner.finditer(lowered))
+        else:
+            hits = scanner.find_in_paragraphs(index.texts)
+        
+        for keyword_lower, i, start in hits:
+            section = section_of(i)
+            for keyword in by_lower[keyword_lower]:
+                details = keyword_details[keyword]
+                if i in counted:
+                    details['count'] += 1
+                details['sections'][section] = details['sections'].get(section, 0) + 1
+                details['positions'].append({'paragraph': i, 'start': start, 'section': section})
+        
+        return keyword_details
+    
+    def _report_data(self, doc, results, context):
+        """Collect everything the analysis report shows into plain, JSON-serializable data"""
+        # Marker ranges come from the body as processed, before any report content is added
+        index = self._document_index(doc, context)
+        content_start, content_end = self._find_bookmark_range(index)
+        disclaimer_start, disclaimer_end = self._find_disclaimer_range(index)
         
-        for keyword in keywords:
-            if keyword.strip():
-                keyword_lower = keyword.strip().lower()
-                # Count whole word matches
-                pattern = r'\b' + re.escape(keyword_lower) + r'\b'
-                matches = len(re.findall(pattern, text_lower))
-                keyword_analysis[keyword.strip()] = matches
+        stats = results['document_statistics']
+        detailed_corrections = []
+        for correction in results['detailed_corrections'].rows(limit=REPORT_CORRECTION_LIMIT):
+            # Paragraphs can be long, so show 100 characters starting just before the change
+            excerpt_start = max(0, correction['start'] - 30)
+            excerpts = []
+            for text in (correction['original'], correction['replacement']):
+                excerpt = text[excerpt_start:excerpt_start + 100]
+                excerpts.append(('...' if excerpt_start else '') + excerpt + ('...' if len(text) > excerpt_start + 100 else ''))
+            detailed_corrections.append({
+                'category': correction['category'],
+                'rule': correction['rule'],
+                'original': excerpts[0],
+                'corrected': excerpts[1]
+            })
         
-        return keyword_analysis
+        return {
+            'title': 'Document Processing Analysis Report',
+            'generated': datetime.datetime.now().isoformat(timespec='seconds'),
+            'configuration': {
+                'target_word_count': context.user_config.get('target_word_count'),
+                'target_reading_level': context.user_config.get('target_reading_level'),
+                'is_medicare_page': context.is_medicare_page
+            },
+            'content_range': [content_start, content_end] if content_start is not None and content_end is not None else None,
+            'disclaimer_range': [disclaimer_start, disclaimer_end] if disclaimer_start is not None and disclaimer_end is not None else None,
+            'statistics': {
+                'word_count': stats['word_count'],
+                'sentence_count': stats['sentence_count'],
+                'paragraph_count': stats['paragraph_count'],
+                'reading_level': stats['reading_level']
+            },
+            'total_corrections': results['total_corrections'],
+            'corrections_by_category': results['corrections_by_category'],
+            'detailed_corrections': detailed_corrections,
+            'more_corrections': max(0, len(results['detailed_corrections']) - REPORT_CORRECTION_LIMIT),
+            'keyword_analysis': context.keyword_analysis,
+            'keyword_sections': {keyword: details['sections'] for keyword, details in context.keyword_details.items()},
+            'medicare_checks': context.medicare_checks if context.is_medicare_page else [],
+            'profile': results.get('profile')
+        }
     
-    def _create_analysis_report(self, doc, results):
+    def _create_analysis_report(self, doc, results, context):
         """Create comprehensive analysis report and append to document"""
-        # Add page break
-        doc.add_page_break()
-        
-        # Title
-        title = doc.add_heading('Document Processing Analysis Report', level=1)
-        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        
-        # Timestamp
-        timestamp_para = doc.add_paragraph()
-        timestamp_run = timestamp_para.add_run(f"Generated: {datetime.datetime.now().strftime('%B %d, %Y at %I:%M %p')}")
-        timestamp_run.italic = True
-        timestamp_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        
-        # Executive Summary
-        doc.add_heading('Executive Summary', level=2)
-        
-        # Configuration used
-        config_para = doc.add_paragraph()
-        config_para.add_run('Processing Configuration: ').bold = True
-        config_text = f"Target: {self.user_config.get('target_word_count', 'Not specified')} words, "
-        config_text += f"Reading Level: {self.user_config.get('target_reading_level', 'Not specified')}, "
-        config_text += f"Medicare Page: {'Yes' if self.user_config.get('is_medicare_page') else 'No'}"
-        config_para.add_run(config_text)
-        
-        # Document structure analysis
-        content_start, content_end = self._find_bookmark_range(doc)
-        disclaimer_start, disclaimer_end = self._find_disclaimer_range(doc)
-        
-        structure_para = doc.add_paragraph()
-        structure_para.add_run('Document Structure: ').bold = True
-        structure_text = ""
-        if content_start is not None and content_end is not None:
-            structure_text += f"Main content area found (paragraphs {content_start}-{content_end}). "
-        else:
-            structure_text += "No content markers found, processed entire document. "
+        append_report(doc, self._report_data(doc, results, context))
+    
+    def _iter_rule_edits(self, text, rule_plan, seconds, profile=None):
+        """Run the rule plan over one paragraph's text, yielding (number, rule, edits) for each rule that changed it
+
+        edits are (start, end, replacement) offsets into the text as it stood before that rule.
+        The time each rule spends matching is added to seconds, a list in plan order, and
+        its searches and matches to profile, a RuleProfile, if given.
+        """
+        # Rules only ever see the text between protected spans (brackets + URLs)
+        scanner = self.span_scanner if profile is None else profile
+        segments, protected = split_protected(text, scanner.find_spans(text))
+        last = len(segments) - 1
+        clock = time.perf_counter
         
-        if disclaimer_start is not None and disclaimer_end is not None:
-            structure_text += f"Disclaimer section found (paragraphs {disclaimer_start}-{disclaimer_end})."
-        else:
-            structure_text += "No disclaimer section found."
+        # Execute the compiled rule plan in order
+        for number, rule in enumerate(rule_plan):
+            start = clock()
+            edits = []
+            offset = 0
+            found = 0
+            for i, segment in enumerate(segments):
+                lead = 1 if i else 0
+                limit = len(segment) - (1 if i < last else 0)
+                parts = []
+                position = 0
+                for match in rule.pattern.finditer(segment):
+                    # The marks stand in for the neighbouring protected spans, so a match may
+                    # sit just inside them but never reach one: an edit at or before a leading
+                    # mark, or at or after a trailing one, would land inside protected content
+                    if match.start() < lead or match.end() > limit:
+                        continue
+                    found += 1
+                    replacement = rule.expand(match)
+                    if replacement == match.group(0):
+                        continue
+                    
+                    edits.append((offset + match.start() - lead, offset + match.end() - lead, replacement))
+                    parts.append(segment[position:match.start()])
+                    parts.append(replacement)
+                    position = match.end()
+                
+                if parts:
+                    parts.append(segment[position:])
+                    segments[i] = ''.join(parts)
+                
+                # Offsets into the joined text: segment marks drop out, protected spans stay
+                offset += len(segment) - lead
+                if i < last:
+                    offset += len(protected[i]) - 1
+            
+            seconds[number] += clock() - start
+            if profile is not None:
+                profile.add_rule(rule, len(segments), found)
+            if edits:
+                yield number, rule, edits
+    
+    def analyze_corporate_rules(self, doc, context=None):
+        """Count the corrections apply_corporate_rules would make, without touching the document"""
+        if context is None:
+            context = ProcessingContext()
+        rule_plan = self._rule_plan_for(context)
         
-        structure_para.add_run(structure_text)
+        total_corrections = 0
+        corrections_by_category = defaultdict(int)
         
-        # Statistics Summary
-        stats = results['document_statistics']
-        summary_para = doc.add_paragraph()
-        summary_para.add_run('Document Statistics: ').bold = True
-        summary_text = (f"{stats['word_count']:,} words • "
-                       f"{stats['sentence_count']} sentences • "
-                       f"Grade {stats['reading_level']:.1f} reading level • "
-                       f"{results['total_corrections']} corrections applied")
-        summary_para.add_run(summary_text)
-        
-        # Word Count Analysis
-        doc.add_heading('Word Count Analysis', level=2)
-        
-        target_words = self.user_config.get('target_word_count')
-        actual_words = stats['word_count']
-        
-        if target_words:
-            word_diff = actual_words - target_words
-            percentage = (actual_words / target_words) * 100
-            
-            word_analysis_para = doc.add_paragraph()
-            word_analysis_para.add_run('Target Word Count: ').bold = True
-            word_analysis_para.add_run(f"{target_words:,} words")
-            
-            actual_para = doc.add_paragraph()
-            actual_para.add_run('Actual Word Count: ').bold = True
-            actual_para.add_run(f"{actual_words:,} words ({percentage:.1f}% of target)")
-            
-            diff_para = doc.add_paragraph()
-            diff_para.add_run('Difference: ').bold = True
-            if word_diff > 0:
-                diff_para.add_run(f"+{word_diff:,} words over target")
-            elif word_diff < 0:
-                diff_para.add_run(f"{word_diff:,} words under target")
-            else:
-                diff_para.add_run("Exactly on target")
-        else:
-            no_target_para = doc.add_paragraph()
-            no_target_para.add_run('No target word count specified. ')
-            no_target_para.add_run(f'Current word count: {actual_words:,} words').bold = True
+        matches = [0] * len(rule_plan)
+        seconds = [0.0] * len(rule_plan)
         
-        # Reading Level Analysis
-        doc.add_heading('Reading Level Analysis', level=2)
+        # Boilerplate repeats across a document, so each distinct paragraph text is only matched once
+        rules_by_text = {}
+        profile = self._rule_profile_for(context)
         
-        target_level = self.user_config.get('target_reading_level')
-        actual_level = stats['reading_level']
+        index = self._document_index(doc, context)
+        start_para, end_para = self._find_bookmark_range(index)
         
-        if target_level:
-            level_diff = actual_level - target_level
-            
-            target_level_para = doc.add_paragraph()
-            target_level_para.add_run('Target Reading Level: ').bold = True
-            target_level_para.add_run(f"Grade {target_level}")
+        for para_idx in index.paragraph_indexes(start_para, end_para):
+            text = index.texts[para_idx]
+            if not text.strip():
+                continue
             
-            actual_level_para = doc.add_paragraph()
-            actual_level_para.add_run('Actual Reading Level: ').bold = True
-            actual_level_para.add_run(f"Grade {actual_level:.1f}")
+            changed = rules_by_text.get(text)
+            if changed is None:
+                changed = tuple((number, rule.category_name, len(edits))
+                                for number, rule, edits in self._iter_rule_edits(text, rule_plan, seconds, profile))
+                rules_by_text[text] = changed
             
-            level_diff_para = doc.add_paragraph()
-            level_diff_para.add_run('Difference: ').bold = True
-            if abs(level_diff) <= 0.5:
-                level_diff_para.add_run("On target")
-            elif level_diff > 0:
-                level_diff_para.add_run(f"{level_diff:+.1f} grades above target")
-            else:
-                level_diff_para.add_run(f"{level_diff:+.1f} grades below target")
-        else:
-            no_target_level_para = doc.add_paragraph()
-            no_target_level_para.add_run('No target reading level specified. ')
-            no_target_level_para.add_run(f'Current reading level: Grade {actual_level:.1f}').bold = True
-        
-        # Keyword Analysis
-        if self.keyword_analysis:
-            doc.add_heading('SEO Keyword Analysis', level=2)
-            
-            for keyword, count in self.keyword_analysis.items():
-                keyword_para = doc.add_paragraph()
-                keyword_para.add_run(f'"{keyword}": ').bold = True
-                keyword_para.add_run(f"{count} occurrences")
-        
-        # Medicare Compliance (if applicable) - Enhanced with location info
-        if self.user_config.get('is_medicare_page') and self.medicare_checks:
-            doc.add_heading('Medicare Compliance Check', level=2)
-            
-            for check in self.medicare_checks:
-                check_para = doc.add_paragraph()
-                check_para.add_run(f"{check['type'].replace('_', ' ').title()}: ").bold = True
-                check_para.add_run(check['description'])
-                
-                # Add location information if available
-                if 'location' in check:
-                    location_para = doc.add_paragraph()
-                    location_para.add_run('Location: ').bold = True
-                    location_para.add_run(check['location'])
-        
-        # Document Structure Guide
-        if self.user_config.get('is_medicare_page'):
-            doc.add_heading('Document Structure Guide', level=2)
-            
-            guide_para = doc.add_paragraph()
-            guide_para.add_run('For optimal Medicare compliance, use these text markers in your document:').bold = True
-            
-            markers_list = [
-                'start_page_copy - Begin main content processing',
-                'end_page_copy - End main content processing', 
-                'start_disclaimer - Begin disclaimer section (for CMS code placement)',
-                'end_disclaimer - End disclaimer section'
-            ]
-            
-            for marker in markers_list:
-                marker_para = doc.add_paragraph()
-                marker_para.add_run(f"• {marker}")
-        
-        # Detailed Changes Table - With fixed styling
-        if results['detailed_corrections']:
-            doc.add_heading('Detailed Changes Applied', level=2)
-            
-            # Create table with basic styling only
-            table = doc.add_table(rows=1, cols=3)
-            
-            # Try to apply a basic table style, fall back to no style if it fails
-            try:
-                table.style = 'Table Grid'
-            except:
-                try:
-                    table.style = 'Light Grid'
-                except:
-                    pass  # Use default table style
-            
-            # Header row
-            header_cells = table.rows[0].cells
-            header_cells[0].text = 'Category'
-            header_cells[1].text = 'Original Text'
-            header_cells[2].text = 'Corrected Text'
-            
-            # Make header bold
-            for cell in header_cells:
-                for paragraph in cell.paragraphs:
-                    for run in paragraph.runs:
-                        run.bold = True
-            
-            # Add correction rows (limit to first 50 for readability)
-            for correction in results['detailed_corrections'][:50]:
-                row_cells = table.add_row().cells
-                row_cells[0].text = correction['rule'].replace('_', ' ').title()
-                row_cells[1].text = correction['original'][:100] + ('...' if len(correction['original']) > 100 else '')
-                row_cells[2].text = correction['replacement'][:100] + ('...' if len(correction['replacement']) > 100 else '')
-            
-            if len(results['detailed_corrections']) > 50:
-                more_para = doc.add_paragraph()
-                more_para.add_run(f"... and {len(results['detailed_corrections']) - 50} more corrections")
-                more_para.italic = True
-        
-        # Corrections by Category
-        if results['corrections_by_category']:
-            doc.add_heading('Corrections by Category', level=2)
-            
-            for category, count in sorted(results['corrections_by_category'].items(), 
-                                        key=lambda x: x[1], reverse=True):
-                if count > 0:
-                    cat_para = doc.add_paragraph()
-                    cat_para.add_run(f"{category.replace('_', ' ').title()}: ").bold = True
-                    cat_para.add_run(f"{count} corrections")
-    
-    def apply_corporate_rules(self, doc):
+            for number, category_name, edit_count in changed:
+                corrections_by_category[category_name] += 1
+                matches[number] += edit_count
+            total_corrections += len(changed)
+        
+        context.add_rule_stats(rule_plan, matches, seconds)
+        return {
+            'total_corrections': total_corrections,
+            'corrections_by_category': dict(corrections_by_category)
+        }
+    
+    def apply_corporate_rules(self, doc, context=None):
         """Apply all corporate rules to document with comprehensive content protection"""
+        if context is None:
+            context = ProcessingContext()
+        rule_plan = self._rule_plan_for(context)
+        
         total_corrections = 0
         corrections_by_category = defaultdict(int)
-        detailed_corrections = []
     
-        print(f"🔄 Applying corporate rules with comprehensive content protection...")
-    
-        # Enable Medicare rules if needed
-        if self.user_config.get('is_medicare_page'):
-            for rule in self.rules.get('medicare_rules', []):
-                rule['enabled'] = True
+        logger.debug("🔄 Applying corporate rules with comprehensive content protection...")
     
         # Find bookmark range
-        start_para, end_para = self._find_bookmark_range(doc)
+        index = self._document_index(doc, context)
+        detailed_corrections = CorrectionLog(index)
+        start_para, end_para = self._find_bookmark_range(index)
         
         if start_para is None or end_para is None:
-            print("📍 Bookmarks not found, processing entire document")
-            paragraphs_to_process = doc.paragraphs
+            logger.debug("📍 Bookmarks not found, processing entire document")
         else:
-            print(f"📍 Processing content between bookmarks (paragraphs {start_para}-{end_para})")
-            paragraphs_to_process = doc.paragraphs[start_para:end_para + 1]
+            logger.debug("📍 Processing content between bookmarks (paragraphs %d-%d)", start_para, end_para)
     
-        # Process each paragraph while preserving formatting
-        for para_idx, paragraph in enumerate(paragraphs_to_process):
-            if not paragraph.text.strip():
+        paragraph_indexes = index.paragraph_indexes(start_para, end_para)
+        progress_step = max(1, len(paragraph_indexes) // RULE_PROGRESS_UPDATES)
+        matches = [0] * len(rule_plan)
+        seconds = [0.0] * len(rule_plan)
+        profile = self._rule_profile_for(context)
+        
+        # Match each paragraph as one string, so text Word split across runs is still
+        # corrected, then map the edits back onto the runs to preserve formatting
+        for done, para_idx in enumerate(paragraph_indexes):
+            if context.rule_progress is not None and done % progress_step == 0:
+                context.rule_progress(done, len(paragraph_indexes))
+            
+            current_text = index.texts[para_idx]
+            if not current_text.strip():
                 continue
-    
-            for run in paragraph.runs:
-                if not run.text.strip():
-                    continue
-                
-                original_text = run.text
-                current_text = original_text
-                
-                # Extract and preserve ALL protected content (brackets + URLs)
-                current_text, protected_placeholders = self._extract_protected_content(current_text)
-    
-                # Apply each rule category
-                for category_name, category_rules in self.rules.items():
-                    if not isinstance(category_rules, list):
+            
+            # The XML fast path skips python-docx's Paragraph and Run proxies
+            if self.xml_fast_path:
+                runs = list(index.elements[para_idx].iterchildren(W_R))
+                original_texts = [xml_run_text(r) for r in runs]
+            else:
+                runs = index.paragraphs[para_idx].runs
+                original_texts = [run.text for run in runs]
+            run_texts = original_texts
+            
+            for number, rule, edits in self._iter_rule_edits(current_text, rule_plan, seconds, profile):
+                run_texts = apply_run_edits(run_texts, edits)
+                new_text = ''.join(run_texts)
+                detailed_corrections.add(rule.category_name, rule.rule_id, para_idx, current_text, new_text, edits)
+                corrections_by_category[rule.category_name] += 1
+                matches[number] += len(edits)
+                current_text = new_text
+                total_corrections += 1
+            
+            # Update only the runs whose text changed
+            if run_texts is not original_texts:
+                for run, original_text, run_text in zip(runs, original_texts, run_texts):
+                    if run_text == original_text:
                         continue
-    
-                    for rule in category_rules:
-                        if not isinstance(rule, dict) or not rule.get('enabled', True):
-                            continue
-    
-                        find_pattern = rule.get('find', '')
-                        replacement = rule.get('replace', '')
-                        is_function = rule.get('is_function', False)
-    
-                        if not find_pattern:
-                            continue
-    
-                        try:
-                            if is_function and callable(replacement):
-                                new_text = re.sub(find_pattern, replacement, current_text, flags=re.IGNORECASE)
-                            else:
-                                case_sensitive = rule.get('case_sensitive', False)
-                                flags = 0 if case_sensitive else re.IGNORECASE
-                                new_text = re.sub(find_pattern, replacement, current_text, flags=flags)
-                            
-                            if new_text != current_text:
-                                detailed_corrections.append({
-                                    'category': category_name,
-                                    'rule': rule.get('category', 'Unknown'),
-                                    'original': current_text,
-                                    'replacement': new_text
-                                })
-                                corrections_by_category[category_name] += 1
-                                current_text = new_text
-                                total_corrections += 1
-                                
-                        except re.error as e:
-                            print(f"⚠️ Regex error in rule {rule.get('category', 'unknown')}: {e}")
-                            continue
-    
-                # Restore protected content
-                current_text = self._restore_protected_content(current_text, protected_placeholders)
-    
-                # Update run text if changes were made
-                if current_text != original_text:
-                    run.text = current_text
-    
-        # Apply post-processing for placeholders with protection
-        for paragraph in paragraphs_to_process:
-            for run in paragraph.runs:
-                if not run.text.strip():
-                    continue
-    
-                text = run.text
-                original_text = text
-                
-                # IMPORTANT: Protect content again before post-processing
-                text_for_processing, protected_placeholders = self._extract_protected_content(text)
-    
-                # Convert NUMBER_WORD_X to actual words (only in unprotected content)
-                if 'NUMBER_WORD_' in text_for_processing:
-                    number_words = {
-                        'NUMBER_WORD_1': 'one', 'NUMBER_WORD_2': 'two', 'NUMBER_WORD_3': 'three',
-                        'NUMBER_WORD_4': 'four', 'NUMBER_WORD_5': 'five', 'NUMBER_WORD_6': 'six',
-                        'NUMBER_WORD_7': 'seven', 'NUMBER_WORD_8': 'eight', 'NUMBER_WORD_9': 'nine'
-                    }
-                    for placeholder, word in number_words.items():
-                        text_for_processing = text_for_processing.replace(placeholder, word)
-    
-                # Restore protected content
-                final_text = self._restore_protected_content(text_for_processing, protected_placeholders)
-    
-                if final_text != original_text:
-                    run.text = final_text
-                    total_corrections += 1
+                    if self.xml_fast_path:
+                        set_xml_run_text(run, run_text)
+                    else:
+                        run.text = run_text
+                index.update_paragraph(para_idx, current_text)
+        
+        if context.rule_progress is not None:
+            context.rule_progress(len(paragraph_indexes), len(paragraph_indexes))
+        index.write_back()
+        context.add_rule_stats(rule_plan, matches, seconds)
     
         return {
             'total_corrections': total_corrections,
@@ -758,23 +1919,28 @@ class MVPDocumentProcessor:
             'detailed_corrections': detailed_corrections
         }
     
-    def calculate_document_stats(self, doc):
+    def calculate_document_stats(self, doc, context=None):
         """Calculate document statistics"""
-        start_para, end_para = self._find_bookmark_range(doc)
+        if context is None:
+            context = ProcessingContext()
+        index = self._document_index(doc, context)
+        start_para, end_para = self._find_bookmark_range(index)
         
-        if start_para is None or end_para is None:
-            paragraphs_to_analyze = doc.paragraphs
-        else:
-            paragraphs_to_analyze = doc.paragraphs[start_para:end_para + 1]
+        texts_to_analyze = [index.texts[i] for i in index.paragraph_indexes(start_para, end_para)]
+        texts_to_analyze = [text for text in texts_to_analyze if text.strip()]
         
-        full_text = ' '.join([p.text for p in paragraphs_to_analyze if p.text.strip()])
+        full_text = ' '.join(texts_to_analyze)
+        
+        # Counts are cached per paragraph text, so after corrections only the
+        # paragraphs that were rewritten are counted again
+        stats_to_aggregate = [paragraph_stats(text) for text in texts_to_analyze]
 
-        word_count = len(full_text.split())
-        sentence_count = len(re.split(r'[.!?]+', full_text))
-        paragraph_count = len([p for p in paragraphs_to_analyze if p.text.strip()])
+        word_count = sum(stats.words for stats in stats_to_aggregate)
+        sentence_count = 1 + sum(stats.terminators for stats in stats_to_aggregate)
+        paragraph_count = len(texts_to_analyze)
 
         try:
-            reading_level = textstat.flesch_kincaid_grade(full_text)
+            reading_level = flesch_kincaid_grade(stats_to_aggregate)
         except:
             reading_level = 0
 
@@ -786,33 +1952,58 @@ class MVPDocumentProcessor:
             'full_text': full_text
         }
     
-    def process_document(self, input_file_path, output_file_path, user_config):
-        """Process document with user configuration"""
+    def process_document(self, input_file, output_file, user_config, progress=None):
+        """Process document with user configuration
+
+        input_file and output_file may each be a path or a seekable file-like object.
+        progress, if given, is called with an event dict as each stage completes:
+        its 'stage' name, overall 'progress' percent and stage details.
+        The results' 'metrics' hold the time spent per stage and per rule, success or not.
+        """
+        def notify(stage, percent, **details):
+            if progress is not None:
+                progress({'stage': stage, 'progress': percent, **details})
+        
+        context = ProcessingContext(user_config)
         try:
-            self.user_config = user_config
-            
             # Load document
-            doc = Document(input_file_path)
-            print(f"✅ Loaded document: {input_file_path}")
+            with context.timed('load'):
+                doc = Document(input_file)
+                self._document_index(doc, context)
+            logger.debug("✅ Loaded document: %s", getattr(input_file, 'name', input_file))
+            notify('loaded', PROGRESS_LOADED, paragraphs=len(context.index.texts))
             
             # Calculate initial statistics
-            stats = self.calculate_document_stats(doc)
+            with context.timed('statistics'):
+                stats = self.calculate_document_stats(doc, context)
             
             # Analyze keywords
-            keywords = user_config.get('keywords', [])
-            if keywords:
-                self.keyword_analysis = self._analyze_keywords(stats['full_text'], keywords)
+            if user_config.get('keywords'):
+                with context.timed('keywords'):
+                    context.keyword_details = self._analyze_keywords(doc, context)
+                context.keyword_analysis = {keyword: details['count'] for keyword, details in context.keyword_details.items()}
             
             # Check Medicare compliance
-            if user_config.get('is_medicare_page'):
-                self.medicare_checks = self._check_medicare_compliance(doc)
+            if context.is_medicare_page:
+                with context.timed('medicare'):
+                    context.medicare_checks = self._check_medicare_compliance(doc, context)
+            notify('analyzed', PROGRESS_ANALYZED, word_count=stats['word_count'], reading_level=stats['reading_level'])
             
-            # Apply corporate rules
-            correction_results = self.apply_corporate_rules(doc)
-            print(f"✅ Applied {correction_results['total_corrections']} corrections")
+            # Apply corporate rules, reporting progress through the paragraphs in range
+            def rule_progress(done, total):
+                share = done / total if total else 1
+                notify('paragraphs', PROGRESS_ANALYZED + round(share * (PROGRESS_CORRECTED - PROGRESS_ANALYZED)),
+                       done=done, total=total)
+            if progress is not None:
+                context.rule_progress = rule_progress
+            with context.timed('rules'):
+                correction_results = self.apply_corporate_rules(doc, context)
+            logger.debug("✅ Applied %d corrections", correction_results['total_corrections'])
+            notify('corrected', PROGRESS_CORRECTED, corrections=correction_results['total_corrections'])
             
             # Recalculate statistics after processing
-            final_stats = self.calculate_document_stats(doc)
+            with context.timed('final_statistics'):
+                final_stats = self.calculate_document_stats(doc, context)
             
             # Create comprehensive results
             results = {
@@ -821,33 +2012,855 @@ class MVPDocumentProcessor:
                 'corrections_by_category': correction_results['corrections_by_category'],
                 'detailed_corrections': correction_results['detailed_corrections'],
                 'document_statistics': final_stats,
-                'keyword_analysis': self.keyword_analysis,
-                'medicare_checks': self.medicare_checks
+                'keyword_analysis': context.keyword_analysis,
+                'keyword_details': context.keyword_details,
+                'medicare_checks': context.medicare_checks,
+                'profile': context.profile.to_dict(context.rule_stats) if context.profile is not None else None
             }
             
-            # Add analysis report to document
-            self._create_analysis_report(doc, results)
+            # Build the analysis report only in the form the caller asked for
+            report_format = context.report_format
+            results['report_format'] = report_format
+            results['report'] = None
+            with context.timed('report'):
+                if report_format == 'append':
+                    self._create_analysis_report(doc, results, context)
+                elif report_format != 'none':
+                    report = self._report_data(doc, results, context)
+                    if report_format == 'docx':
+                        report_doc = Document()
+                        append_report(report_doc, report, page_break=False)
+                        report_file = io.BytesIO()
+                        report_doc.save(report_file)
+                        results['report'] = report_file.getvalue()
+                    elif report_format == 'html':
+                        results['report'] = render_report_html(report)
+                    else:
+                        results['report'] = report
+            notify('report', PROGRESS_REPORT, report_format=report_format)
             
-            # Save processed document
-            doc.save(output_file_path)
-            print(f"✅ Saved processed document with analysis report: {output_file_path}")
+            # Save processed document, copying the parts nothing touched straight through
+            with context.timed('save'):
+                if self.passthrough_save:
+                    save_document(doc, input_file, output_file, context.index.modified_parts | {doc.part})
+                else:
+                    doc.save(output_file)
+            logger.debug("✅ Saved processed document with analysis report: %s", getattr(output_file, 'name', output_file))
+            notify('saved', PROGRESS_SAVED)
             
+            results['metrics'] = context.metrics_sample()
             return results
             
         except Exception as e:
-            print(f"❌ Error processing document: {e}")
+            logger.exception("❌ Error processing document: %s", e)
             return {
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'metrics': context.metrics_sample()
+            }
+
+# Initialize processor (stateless and shared read-only across requests)
+processor = MVPDocumentProcessor(
+    xml_fast_path=app.config['XML_FAST_PATH'],
+    passthrough_save=app.config['PASSTHROUGH_SAVE'],
+    rules_dir=app.config['RULES_DIR'],
+    rules_cache_dir=app.config['RULES_CACHE_DIR'],
+    reload_interval=app.config['RULES_RELOAD_INTERVAL']
+)
+
+@app.before_request
+def reload_rule_packs():
+    """Pick up edited rule packs without a restart"""
+    processor.check_rule_packs()
+
+_jobs_resumed = False
+
+@app.before_request
+def resume_jobs():
+    """On a worker's first request, recover jobs interrupted by exited workers and restart the queue"""
+    global _jobs_resumed
+    if _jobs_resumed:
+        return
+    _jobs_resumed = True
+    try:
+        job_store.recover()
+        if job_store.has_queued():
+            get_batch_pool().submit(run_queued_jobs)
+    except Exception as e:
+        logger.exception("❌ Error resuming queued jobs: %s", e)
+
+def parse_user_config(form):
+    """Build a normalized user configuration from submitted form fields"""
+    user_config = {
+        'target_word_count': form.get('target_word_count'),
+        'keywords': [k.strip() for k in form.get('keywords', '').split(',') if k.strip()][:app.config['MAX_KEYWORDS']],
+        'target_reading_level': form.get('target_reading_level'),
+        'is_medicare_page': form.get('is_medicare_page') == 'true',
+        'report': form.get('report', 'append'),
+        'profile': form.get('profile') == 'true' or app.config['PROFILE_RULES']
+    }
+    
+    if user_config['report'] not in REPORT_FORMATS:
+        user_config['report'] = 'append'
+    
+    # Convert numeric fields
+    if user_config['target_word_count']:
+        try:
+            user_config['target_word_count'] = int(user_config['target_word_count'])
+        except:
+            user_config['target_word_count'] = None
+    
+    if user_config['target_reading_level']:
+        try:
+            user_config['target_reading_level'] = float(user_config['target_reading_level'])
+        except:
+            user_config['target_reading_level'] = None
+    
+    return user_config
+
+def processed_filename(filename, extension='docx'):
+    """Download name for a processed document, or for a zip of it and its report"""
+    original_filename = secure_filename(filename)
+    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    return f"{original_filename.rsplit('.', 1)[0]}_processed_{timestamp}.{extension}"
+
+def report_filename(output_filename, report_format):
+    """Name of a separate report file, next to its processed document"""
+    return f"{output_filename.rsplit('.', 1)[0]}_report.{report_format}"
+
+def report_bytes(results):
+    """A separate report from process_document results as file contents, or None"""
+    report = results.get('report')
+    if report is None:
+        return None
+    if results['report_format'] == 'html':
+        return report.encode('utf-8')
+    if results['report_format'] == 'json':
+        return json.dumps(report, indent=2).encode('utf-8')
+    return report
+
+def bundle_outputs(output_filename, output, report_format, report):
+    """Zip a processed document together with its separate report"""
+    bundle = io.BytesIO()
+    with zipfile.ZipFile(bundle, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(output_filename, output)
+        archive.writestr(report_filename(output_filename, report_format), report)
+    return bundle.getvalue()
+
+# Batch worker pool, created on first use so only workers that serve batches pay for it
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+def get_batch_pool():
+    """Get the shared process pool for batch processing
+
+    The pool is created on a request thread of a threaded worker, and a plain fork there
+    could hand a pool process a lock another thread holds (logging, sqlite). Pool
+    processes are started from a single-threaded fork server instead.
+    """
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = ProcessPoolExecutor(max_workers=app.config['BATCH_WORKERS'],
+                                              mp_context=multiprocessing.get_context('forkserver'))
+        return _batch_pool
+
+def process_batch_item(filename, data, user_config, progress=None):
+    """Process one batch document in a pool worker, returning its summary, output bytes and separate report bytes"""
+    output_file = io.BytesIO()
+    processor.check_rule_packs()
+    results = processor.process_document(io.BytesIO(data), output_file, user_config, progress)
+    record_document_metrics('process', results['success'], results['metrics'], len(data))
+    
+    summary = {'filename': filename, 'success': results['success']}
+    if not results['success']:
+        summary['error'] = results['error']
+        return summary, None, None
+    
+    stats = dict(results['document_statistics'])
+    stats.pop('full_text', None)
+    summary.update({
+        'total_corrections': results['total_corrections'],
+        'corrections_by_category': results['corrections_by_category'],
+        'document_statistics': stats,
+        'keyword_analysis': results['keyword_analysis'],
+        'keyword_sections': {keyword: details['sections'] for keyword, details in results['keyword_details'].items()},
+        'medicare_checks': results['medicare_checks'],
+        'report_format': results['report_format']
+    })
+    if results['profile'] is not None:
+        summary['profile'] = results['profile']
+    return summary, output_file.getvalue(), report_bytes(results)
+
+def too_many_files_error():
+    return f"Too many files: a batch can contain at most {app.config['MAX_BATCH_FILES']}"
+
+def extract_zip_documents(stream, max_files, max_size):
+    """Read the .docx members of an uploaded zip archive
+
+    The member count and uncompressed sizes are checked against the archive directory
+    before anything is decompressed, so a zip bomb is rejected without being inflated.
+    zipfile stops reading a member at its recorded size.
+    """
+    with zipfile.ZipFile(stream) as archive:
+        members = []
+        for info in archive.infolist():
+            name = os.path.basename(info.filename)
+            if info.is_dir() or name.startswith('.') or '__MACOSX' in info.filename or not allowed_file(name):
+                continue
+            if info.file_size > app.config['MAX_CONTENT_LENGTH']:
+                raise ValueError(f'{name} is larger than the 16MB document limit')
+            members.append((name, info))
+        
+        if len(members) > max_files:
+            raise ValueError(too_many_files_error())
+        if sum(info.file_size for _, info in members) > max_size:
+            raise ValueError(f"Batch too large: its documents can total at most "
+                             f"{app.config['MAX_BATCH_UNCOMPRESSED_SIZE'] // (1024 * 1024)}MB uncompressed")
+        return [(name, archive.read(info)) for name, info in members]
+
+def process_alive(pid):
+    """Whether a process with this id is still running on this host"""
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class JobStore:
+    """
+    SQLite-backed queue for async processing jobs. Inputs and results live as files
+    next to the database, so every gunicorn worker and pool process sees the same jobs.
+    Pool workers claim queued jobs from the table, so a job outlives the process that
+    queued it; each claim records the claiming process, so jobs it was running when
+    it exited can be found and run again.
+    """
+    
+    def __init__(self, job_dir, ttl, max_attempts):
+        self.job_dir = job_dir
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.db_path = os.path.join(job_dir, 'jobs.sqlite3')
+        self._initialized = False
+    
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(self.job_dir, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        if not self._initialized:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, status TEXT NOT NULL, progress INTEGER NOT NULL, '
+                'filename TEXT NOT NULL, output_filename TEXT, user_config TEXT NOT NULL, '
+                'summary TEXT, error TEXT, created REAL NOT NULL, updated REAL NOT NULL, '
+                'worker INTEGER, attempts INTEGER NOT NULL DEFAULT 0)'
+            )
+            # Job databases from before jobs were claimed lack the claim columns
+            columns = {row['name'] for row in connection.execute('PRAGMA table_info(jobs)')}
+            for column, definition in (('worker', 'INTEGER'), ('attempts', 'INTEGER NOT NULL DEFAULT 0')):
+                if column not in columns:
+                    try:
+                        connection.execute(f'ALTER TABLE jobs ADD COLUMN {column} {definition}')
+                    except sqlite3.OperationalError:
+                        pass  # Another worker added it first
+            self._initialized = True
+        return connection
+    
+    def input_path(self, job_id):
+        return os.path.join(self.job_dir, f'{job_id}.input.docx')
+    
+    def result_path(self, job_id):
+        return os.path.join(self.job_dir, f'{job_id}.result.docx')
+    
+    def create(self, filename, stream, user_config):
+        """Queue a new job, saving its input document; returns the job id
+
+        Without a stream the job starts out processing, claimed by this process, for
+        callers that process the document themselves and only record progress and the
+        result here.
+        """
+        self.purge_expired()
+        job_id = uuid.uuid4().hex
+        connection = self._connect()
+        if stream is not None:
+            with open(self.input_path(job_id), 'wb') as input_file:
+                stream.seek(0)
+                input_file.write(stream.read())
+        
+        now = time.time()
+        with connection:
+            connection.execute(
+                'INSERT INTO jobs (id, status, progress, filename, user_config, created, updated, worker) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, 'queued' if stream is not None else 'processing', 0, filename, json.dumps(user_config),
+                 now, now, None if stream is not None else os.getpid())
+            )
+        connection.close()
+        return job_id
+    
+    def update(self, job_id, **fields):
+        fields['updated'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        connection = self._connect()
+        with connection:
+            connection.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+        connection.close()
+    
+    def get(self, job_id):
+        """Job status as a dict, or None for unknown or expired jobs"""
+        connection = self._connect()
+        row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        connection.close()
+        return self._job(row)
+    
+    def _job(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['user_config'] = json.loads(job['user_config'])
+        job['summary'] = json.loads(job['summary']) if job['summary'] else None
+        return job
+    
+    def claim(self):
+        """Mark the oldest queued job as processing by this process and return it, or None
+
+        The single UPDATE is atomic, so concurrent workers never claim the same job.
+        """
+        connection = self._connect()
+        with connection:
+            row = connection.execute(
+                "UPDATE jobs SET status = 'processing', progress = 5, worker = ?, attempts = attempts + 1, "
+                "updated = ? WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1) "
+                "RETURNING *",
+                (os.getpid(), time.time())
+            ).fetchone()
+        connection.close()
+        return self._job(row)
+    
+    def has_queued(self):
+        connection = self._connect()
+        row = connection.execute("SELECT 1 FROM jobs WHERE status = 'queued' LIMIT 1").fetchone()
+        connection.close()
+        return row is not None
+    
+    def recover(self):
+        """Requeue jobs left processing by a process that has exited, or mark them failed
+
+        A job is requeued while its input is still on disk and it has been tried fewer
+        than max_attempts times. Streamed jobs keep no input, so they are marked failed.
+        """
+        connection = self._connect()
+        stale = [row for row in connection.execute("SELECT id, worker, attempts FROM jobs WHERE status = 'processing'")
+                 if not process_alive(row['worker'])]
+        now = time.time()
+        with connection:
+            for row in stale:
+                # Matching the worker too keeps two sweeping processes from both acting on a job
+                if row['attempts'] < self.max_attempts and os.path.exists(self.input_path(row['id'])):
+                    connection.execute("UPDATE jobs SET status = 'queued', progress = 0, worker = NULL, updated = ? "
+                                       "WHERE id = ? AND status = 'processing' AND worker IS ?",
+                                       (now, row['id'], row['worker']))
+                    logger.warning("🔁 Requeued job %s after its worker (pid %s) exited", row['id'], row['worker'])
+                else:
+                    connection.execute("UPDATE jobs SET status = 'failed', progress = 100, error = ?, updated = ? "
+                                       "WHERE id = ? AND status = 'processing' AND worker IS ?",
+                                       ('The worker processing this job stopped', now, row['id'], row['worker']))
+                    logger.warning("⚠️ Job %s failed: its worker (pid %s) exited", row['id'], row['worker'])
+        connection.close()
+        
+        for row in stale:
+            input_path = self.input_path(row['id'])
+            if os.path.exists(input_path) and self.get(row['id'])['status'] == 'failed':
+                os.unlink(input_path)
+    
+    def purge_expired(self):
+        """Delete jobs, inputs and results older than the TTL"""
+        connection = self._connect()
+        cutoff = time.time() - self.ttl
+        expired = [row['id'] for row in connection.execute('SELECT id FROM jobs WHERE created < ?', (cutoff,))]
+        with connection:
+            connection.execute('DELETE FROM jobs WHERE created < ?', (cutoff,))
+        connection.close()
+        
+        for job_id in expired:
+            for path in (self.input_path(job_id), self.result_path(job_id)):
+                if os.path.exists(path):
+                    os.unlink(path)
+
+job_store = JobStore(app.config['JOB_DIR'], app.config['JOB_TTL'], app.config['JOB_MAX_ATTEMPTS'])
+
+# Histogram buckets: seconds, upload bytes and paragraphs per document
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2)
+PARAGRAPH_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Every metric /metrics exposes: name -> (type, help, histogram buckets)
+METRICS = OrderedDict([
+    ('mvp_documents_total', ('counter', 'Documents processed or analyzed, by outcome', None)),
+    ('mvp_document_duration_seconds', ('histogram', 'Time to process or analyze one document', LATENCY_BUCKETS)),
+    ('mvp_stage_duration_seconds', ('histogram', 'Time spent in each processing stage', LATENCY_BUCKETS)),
+    ('mvp_document_size_bytes', ('histogram', 'Size of uploaded documents', SIZE_BUCKETS)),
+    ('mvp_document_paragraphs', ('histogram', 'Paragraphs per document, table cells included', PARAGRAPH_BUCKETS)),
+    ('mvp_rule_matches_total', ('counter', 'Text replacements made (or previewed) by each rule', None)),
+    ('mvp_rule_seconds_total', ('counter', 'Time spent matching each rule', None)),
+])
+METRIC_LABEL_ESCAPES = str.maketrans({'\\': '\\\\', '"': '\\"', '\n': '\\n'})
+
+def metric_labels(**labels):
+    """A series' label set in exposition format, such as 'operation="process",stage="load"'"""
+    return ','.join(f'{name}="{str(value).translate(METRIC_LABEL_ESCAPES)}"' for name, value in labels.items())
+
+def histogram_samples(name, labels, value):
+    """The increments that record one observation in a histogram"""
+    bucket = next((str(bound) for bound in METRICS[name][2] if value <= bound), '+Inf')
+    return [(f'{name}_bucket', labels, bucket, 1), (f'{name}_sum', labels, '', value)]
+
+class MetricsStore:
+    """
+    SQLite-backed Prometheus metrics. Every gunicorn worker and pool process adds to
+    the same series, so /metrics covers the whole service whichever worker answers.
+    Histogram buckets are stored as per-bucket counts and made cumulative when rendered.
+    """
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._initialized = False
+        self._local = threading.local()
+    
+    def _connect(self):
+        """This thread's connection; kept open, since every document adds to the metrics
+
+        Closing the last connection checkpoints the WAL, which would cost more than the
+        update itself. A process forked from this one opens its own connection.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=5)
+        connection.execute('PRAGMA synchronous=NORMAL')
+        if not self._initialized:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS metrics ('
+                'name TEXT NOT NULL, labels TEXT NOT NULL, bucket TEXT NOT NULL, value REAL NOT NULL, '
+                'PRIMARY KEY (name, labels, bucket))'
+            )
+            self._initialized = True
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+    
+    def add(self, samples):
+        """Add (name, labels, bucket, increment) samples in a single transaction"""
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                'INSERT INTO metrics (name, labels, bucket, value) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (name, labels, bucket) DO UPDATE SET value = value + excluded.value',
+                samples
+            )
+    
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        rows = self._connect().execute('SELECT name, labels, bucket, value FROM metrics ORDER BY name, labels').fetchall()
+        
+        series = defaultdict(list)
+        for name, labels, bucket, value in rows:
+            series[name].append((labels, bucket, value))
+        
+        def line(name, labels, value):
+            return f'{name}{{{labels}}} {value!r}' if labels else f'{name} {value!r}'
+        
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                lines.extend(line(name, labels, value) for labels, _, value in series[name])
+                continue
+            
+            counts = defaultdict(dict)
+            for labels, bucket, value in series[f'{name}_bucket']:
+                counts[labels][bucket] = value
+            sums = {labels: value for labels, _, value in series[f'{name}_sum']}
+            for labels, bucket_counts in counts.items():
+                prefix = f'{labels},' if labels else ''
+                cumulative = 0
+                for bucket in [str(bound) for bound in buckets] + ['+Inf']:
+                    cumulative += bucket_counts.get(bucket, 0)
+                    lines.append(line(f'{name}_bucket', f'{prefix}le="{bucket}"', cumulative))
+                lines.append(line(f'{name}_sum', labels, sums.get(labels, 0)))
+                lines.append(line(f'{name}_count', labels, cumulative))
+        return '\n'.join(lines) + '\n'
+
+metrics_store = MetricsStore(app.config['METRICS_DB'])
+
+def record_document_metrics(operation, success, sample, size=None):
+    """Add one processed or analyzed document's timings, size and rule counters to the metrics store"""
+    labels = metric_labels(operation=operation)
+    samples = [('mvp_documents_total', metric_labels(operation=operation, status='success' if success else 'error'), '', 1)]
+    samples += histogram_samples('mvp_document_duration_seconds', labels, sample['duration'])
+    for stage, seconds in sample['stages'].items():
+        samples += histogram_samples('mvp_stage_duration_seconds', metric_labels(operation=operation, stage=stage), seconds)
+    if size is not None:
+        samples += histogram_samples('mvp_document_size_bytes', labels, size)
+    if sample['paragraphs'] is not None:
+        samples += histogram_samples('mvp_document_paragraphs', labels, sample['paragraphs'])
+    for rule_id, (category, matches, seconds) in sample['rules'].items():
+        rule_labels = metric_labels(operation=operation, category=category, rule=rule_id)
+        samples.append(('mvp_rule_matches_total', rule_labels, '', matches))
+        samples.append(('mvp_rule_seconds_total', rule_labels, '', seconds))
+    
+    try:
+        metrics_store.add(samples)
+    except sqlite3.Error as e:
+        logger.warning("⚠️ Could not record metrics: %s", e)
+
+def server_timing(stages):
+    """A Server-Timing header value for a document's stage timings, shown by browser dev tools"""
+    return ', '.join(f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in stages.items())
+
+def job_progress(job_id):
+    """A process_document progress hook that records the overall percentage of a job"""
+    last = [None]
+    
+    def progress(event):
+        if event['progress'] != last[0]:
+            last[0] = event['progress']
+            job_store.update(job_id, progress=event['progress'])
+    return progress
+
+def store_job_result(job_id, filename, summary, output, report):
+    """Save a processed document (zipped with its separate report, if any) as a job's result
+
+    Returns the bytes stored.
+    """
+    output_filename = processed_filename(filename)
+    if report is not None:
+        output = bundle_outputs(output_filename, output, summary['report_format'], report)
+        output_filename = processed_filename(filename, 'zip')
+    
+    with open(job_store.result_path(job_id), 'wb') as result_file:
+        result_file.write(output)
+    job_store.update(job_id, status='completed', progress=100, summary=json.dumps(summary),
+                     output_filename=output_filename)
+    return output
+
+def run_queued_jobs():
+    """Claim and process queued jobs in a pool worker until none are left
+
+    Every async request submits one of these; whichever pool worker gets to a job
+    first runs it, even if the process that queued it has since exited.
+    """
+    while True:
+        job = job_store.claim()
+        if job is None:
+            return
+        run_job(job)
+
+def run_job(job):
+    """Process a claimed job, recording progress and the result in the job store"""
+    job_id = job['id']
+    input_path = job_store.input_path(job_id)
+    try:
+        with open(input_path, 'rb') as input_file:
+            data = input_file.read()
+        
+        summary, output, report = process_batch_item(job['filename'], data, job['user_config'], job_progress(job_id))
+        
+        if output is None:
+            job_store.update(job_id, status='failed', progress=100, error=summary['error'])
+        else:
+            store_job_result(job_id, job['filename'], summary, output, report)
+    except Exception as e:
+        logger.exception("❌ Error running job %s: %s", job_id, e)
+        job_store.update(job_id, status='failed', progress=100, error=str(e))
+    
+    # The input stays on disk until the job is finished, so an interrupted job can be run again
+    if os.path.exists(input_path):
+        os.unlink(input_path)
+
+class ResultCache:
+    """
+    LRU cache of /analyze JSON and /process output keyed by a hash of the upload,
+    its configuration and the rule set version. Entries are bounded by count, total
+    size and age; an optional on-disk tier, bounded by size and age, lets every
+    gunicorn worker share results.
+    """
+    
+    # Entry kinds, named by the key prefix, and the file extension each is stored with on disk
+    DISK_EXTENSIONS = {
+        'analyze': '.json',  # /analyze JSON
+        'process': '.docx',  # Processed document
+        'bundle': '.zip',  # Processed document zipped with its separate report
+    }
+    
+    def __init__(self, max_entries, max_bytes, ttl, disk_dir=None, disk_max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+    
+    @staticmethod
+    def make_key(kind, upload_digest, user_config, rules_version):
+        """Cache key for an upload, given the running SHA-256 of its bytes from hash_upload"""
+        digest = upload_digest.copy()
+        digest.update(json.dumps(user_config, sort_keys=True).encode('utf-8'))
+        return f'{kind}-{rules_version}-{digest.hexdigest()}'
+    
+    def _disk_path(self, key):
+        # Analysis results are JSON, processed documents and bundles are raw bytes
+        return os.path.join(self.disk_dir, key + self.DISK_EXTENSIONS[key.split('-', 1)[0]])
+    
+    def get(self, key):
+        """Cached value for key, or None"""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires, value, size = entry
+                if expires > now:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+                self.total_bytes -= size
+        
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                if os.path.getmtime(path) + self.ttl > now:
+                    with open(path, 'rb') as cache_file:
+                        data = cache_file.read()
+                    value = json.loads(data) if path.endswith('.json') else data
+                    self._store(key, value, len(data), os.path.getmtime(path) + self.ttl)
+                    with self.lock:
+                        self.disk_hits += 1
+                    return value
+                os.unlink(path)
+            except OSError:
+                pass
+        
+        with self.lock:
+            self.misses += 1
+        return None
+    
+    def put(self, key, value):
+        """Cache a JSON-serializable dict or processed document bytes"""
+        data = value if isinstance(value, bytes) else json.dumps(value).encode('utf-8')
+        if len(data) > self.max_bytes:
+            return
+        self._store(key, value, len(data), time.time() + self.ttl)
+        
+        if self.disk_dir:
+            # Write then rename, so other workers never read a partial entry
+            path = self._disk_path(key)
+            temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            try:
+                with open(temp_path, 'wb') as cache_file:
+                    cache_file.write(data)
+                os.replace(temp_path, path)
+            except OSError as e:
+                logger.warning("⚠️ Could not write result cache entry: %s", e)
+            self._prune_disk()
+    
+    def _prune_disk(self):
+        """Delete expired files from the on-disk tier, then the oldest while it is over its size budget"""
+        now = time.time()
+        files = []
+        try:
+            with os.scandir(self.disk_dir) as scan:
+                for entry in scan:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue  # Removed by another worker
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError as e:
+            logger.warning("⚠️ Could not prune result cache directory: %s", e)
+            return
+        
+        # Abandoned temporary files expire like entries do
+        files.sort()
+        total_bytes = sum(size for _, size, _ in files)
+        for mtime, size, path in files:
+            if mtime + self.ttl > now and (self.disk_max_bytes is None or total_bytes <= self.disk_max_bytes):
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total_bytes -= size
+    
+    def _store(self, key, value, size, expires):
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[2]
+            self.entries[key] = (expires, value, size)
+            self.total_bytes += size
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+    
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0
             }
 
-# Initialize processor
-processor = MVPDocumentProcessor()
+result_cache = ResultCache(
+    app.config['RESULT_CACHE_MAX_ENTRIES'],
+    app.config['RESULT_CACHE_MAX_BYTES'],
+    app.config['RESULT_CACHE_TTL'],
+    app.config['RESULT_CACHE_DIR'],
+    app.config['RESULT_CACHE_DISK_MAX_BYTES']
+)
+
+UPLOAD_HASH_CHUNK_SIZE = 1024 * 1024
+
+def hash_upload(file):
+    """SHA-256 and size of an upload, read in chunks so a spooled upload stays on disk
+
+    The stream is left rewound for processing.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: file.stream.read(UPLOAD_HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    file.stream.seek(0)
+    return digest, size
+
+class ZipStream(io.RawIOBase):
+    """Write-only buffer that hands zip output to a streaming response as it is produced"""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def stream_batch_results(futures, filenames, user_config):
+    """Yield a zip of processed documents as they finish, ending with summary.json"""
+    stream = ZipStream()
+    summaries = [None] * len(filenames)
+    used_names = set()
+    
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED) as archive:
+        for future in as_completed(futures):
+            position = futures[future]
+            try:
+                summary, output, report = future.result()
+            except Exception as e:
+                summary, output, report = {'filename': filenames[position], 'success': False, 'error': str(e)}, None, None
+            
+            if output is not None:
+                output_name = processed_filename(summary['filename'])
+                stem = output_name.rsplit('.', 1)[0]
+                copy = 1
+                while output_name in used_names:
+                    copy += 1
+                    output_name = f"{stem}_{copy}.docx"
+                used_names.add(output_name)
+                summary['output_filename'] = output_name
+                archive.writestr(output_name, output)
+                if report is not None:
+                    summary['report_filename'] = report_filename(output_name, summary['report_format'])
+                    archive.writestr(summary['report_filename'], report)
+            
+            summaries[position] = summary
+            yield stream.drain()
+        
+        archive.writestr('summary.json', json.dumps({
+            'total_files': len(summaries),
+            'processed': sum(1 for summary in summaries if summary['success']),
+            'failed': sum(1 for summary in summaries if not summary['success']),
+            'total_corrections': sum(summary.get('total_corrections', 0) for summary in summaries),
+            'user_config': user_config,
+            'files': summaries
+        }, indent=2))
+    yield stream.drain()
+
+def stream_processing(job_id, filename, data, user_config, cache_key, result_url):
+    """Process a document on a background thread, yielding its progress events as NDJSON lines
+
+    The processed document is stored as the job's result; the final 'done' event
+    carries the job id as the token to download it with.
+    """
+    events = queue.Queue()
+    record_progress = job_progress(job_id)
+    
+    def progress(event):
+        record_progress(event)
+        events.put(event)
+    
+    def work():
+        try:
+            summary, output, report = process_batch_item(filename, data, user_config, progress)
+            if output is None:
+                job_store.update(job_id, status='failed', progress=100, error=summary['error'])
+                events.put({'stage': 'failed', 'progress': 100, 'error': f"Processing failed: {summary['error']}"})
+                return
+            result_cache.put(cache_key, store_job_result(job_id, filename, summary, output, report))
+            events.put({'stage': 'done', 'progress': 100, 'token': job_id, 'result_url': result_url, 'summary': summary})
+        except Exception as e:
+            logger.exception("❌ Error streaming job %s: %s", job_id, e)
+            job_store.update(job_id, status='failed', progress=100, error=str(e))
+            events.put({'stage': 'failed', 'progress': 100, 'error': 'An unexpected error occurred during processing'})
+        finally:
+            events.put(None)
+    
+    threading.Thread(target=work, daemon=True).start()
+    yield json.dumps({'stage': 'queued', 'progress': 0, 'token': job_id}) + '\n'
+    
+    while True:
+        try:
+            event = events.get(timeout=app.config['STREAM_HEARTBEAT'])
+        except queue.Empty:
+            # Keep proxies and load balancers from closing an idle connection mid-stage
+            yield json.dumps({'stage': 'heartbeat'}) + '\n'
+            continue
+        if event is None:
+            return
+        yield json.dumps(event) + '\n'
 
 @app.route('/')
 def index():
     """Main page"""
-    return render_template('index.html')
+    return render_template('index.html', max_keywords=app.config['MAX_KEYWORDS'])
 
 @app.route('/process', methods=['POST'])
 def process_document():
@@ -865,64 +2878,150 @@ def process_document():
             return jsonify({'error': 'Invalid file type. Please upload a .docx file'}), 400
         
         # Get user configuration
-        user_config = {
-            'target_word_count': request.form.get('target_word_count'),
-            'keywords': [k.strip() for k in request.form.get('keywords', '').split(',') if k.strip()][:5],
-            'target_reading_level': request.form.get('target_reading_level'),
-            'is_medicare_page': request.form.get('is_medicare_page') == 'true'
-        }
+        user_config = parse_user_config(request.form)
         
-        # Convert numeric fields
-        if user_config['target_word_count']:
-            try:
-                user_config['target_word_count'] = int(user_config['target_word_count'])
-            except:
-                user_config['target_word_count'] = None
+        # Async mode: hand the document to the worker pool and return a job id immediately
+        if request.args.get('async') == '1':
+            job_id = job_store.create(file.filename, file.stream, user_config)
+            get_batch_pool().submit(run_queued_jobs)
+            return jsonify({
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': url_for('job_status', job_id=job_id),
+                'result_url': url_for('job_result', job_id=job_id)
+            }), 202
         
-        if user_config['target_reading_level']:
-            try:
-                user_config['target_reading_level'] = float(user_config['target_reading_level'])
-            except:
-                user_config['target_reading_level'] = None
+        # A separate report comes back zipped together with the processed document
+        separate_report = user_config['report'] not in ('append', 'none')
+        output_filename = processed_filename(file.filename)
         
-        # Create temporary files
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as input_temp:
-            file.save(input_temp.name)
-            input_path = input_temp.name
+        # Re-uploads of the same document and configuration are served from the cache
+        digest, size = hash_upload(file)
+        cache_key = ResultCache.make_key('bundle' if separate_report else 'process', digest, user_config,
+                                         processor.rules_version)
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as output_temp:
-            output_path = output_temp.name
+        # Streaming mode: NDJSON progress events, ending with a token to download the result with
+        if request.args.get('stream') == '1':
+            job_id = job_store.create(file.filename, None, user_config)
+            result_url = url_for('job_result', job_id=job_id)
+            cached_output = result_cache.get(cache_key)
+            if cached_output is not None:
+                output_filename = processed_filename(file.filename, 'zip' if separate_report else 'docx')
+                with open(job_store.result_path(job_id), 'wb') as result_file:
+                    result_file.write(cached_output)
+                job_store.update(job_id, status='completed', progress=100, output_filename=output_filename)
+                events = [{'stage': 'done', 'progress': 100, 'token': job_id, 'result_url': result_url, 'cached': True}]
+                return Response((json.dumps(event) + '\n' for event in events), mimetype='application/x-ndjson')
+            # The upload stream closes when the request ends, before the background thread is done with it
+            data = file.stream.read()
+            return Response(
+                stream_processing(job_id, file.filename, data, user_config, cache_key, result_url),
+                mimetype='application/x-ndjson',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
         
-        # Process document
-        results = processor.process_document(input_path, output_path, user_config)
+        cached_output = result_cache.get(cache_key)
+        timing = None
         
-        # Clean up input file
-        os.unlink(input_path)
+        if cached_output is not None:
+            output_file = io.BytesIO(cached_output)
+        else:
+            # Process straight from the upload stream into an in-memory output file
+            output_file = tempfile.SpooledTemporaryFile(max_size=app.config['SPOOL_MAX_SIZE'])
+            results = processor.process_document(file.stream, output_file, user_config)
+            record_document_metrics('process', results['success'], results['metrics'], size)
+            timing = server_timing(results['metrics']['stages'])
+            
+            if not results['success']:
+                output_file.close()
+                return jsonify({'error': f"Processing failed: {results['error']}"}), 500
+            
+            output_file.seek(0)
+            if separate_report:
+                output = bundle_outputs(output_filename, output_file.read(), user_config['report'], report_bytes(results))
+                output_file.close()
+                output_file = io.BytesIO(output)
+            # An output that spilled to disk is not read back into memory just to cache it
+            if output_file.seek(0, os.SEEK_END) <= app.config['SPOOL_MAX_SIZE']:
+                output_file.seek(0)
+                result_cache.put(cache_key, output_file.read())
+            output_file.seek(0)
         
-        if not results['success']:
-            os.unlink(output_path)
-            return jsonify({'error': f"Processing failed: {results['error']}"}), 500
+        if separate_report:
+            response = send_file(
+                output_file,
+                as_attachment=True,
+                download_name=processed_filename(file.filename, 'zip'),
+                mimetype='application/zip'
+            )
+        else:
+            response = send_file(
+                output_file,
+                as_attachment=True,
+                download_name=output_filename,
+                mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+            )
+        if timing:
+            response.headers['Server-Timing'] = timing
+        return response
         
-        # Generate filename
-        original_filename = secure_filename(file.filename)
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-        processed_filename = f"{original_filename.rsplit('.', 1)[0]}_processed_{timestamp}.docx"
+    except Exception as e:
+        logger.exception("❌ Error in process_document: %s", e)
+        return jsonify({'error': 'An unexpected error occurred during processing'}), 500
+
+@app.route('/process/batch', methods=['POST'])
+def process_batch():
+    """Process many documents (or a zip of them) with one shared configuration"""
+    try:
+        uploads = [f for f in request.files.getlist('files') + request.files.getlist('file') if f.filename]
+        if not uploads:
+            return jsonify({'error': 'No files uploaded'}), 400
         
-        return send_file(
-            output_path,
-            as_attachment=True,
-            download_name=processed_filename,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+        documents = []
+        for upload in uploads:
+            if upload.filename.lower().endswith('.zip'):
+                remaining_size = app.config['MAX_BATCH_UNCOMPRESSED_SIZE'] - sum(len(data) for _, data in documents)
+                documents.extend(extract_zip_documents(
+                    upload.stream, app.config['MAX_BATCH_FILES'] - len(documents), remaining_size))
+            elif allowed_file(upload.filename):
+                documents.append((upload.filename, upload.read()))
+            else:
+                return jsonify({'error': f'Invalid file type: {upload.filename}. Please upload .docx files or a .zip of them'}), 400
+        
+        if not documents:
+            return jsonify({'error': 'No .docx files found in upload'}), 400
+        
+        if len(documents) > app.config['MAX_BATCH_FILES']:
+            return jsonify({'error': too_many_files_error()}), 400
+        
+        # Get user configuration shared by every document
+        user_config = parse_user_config(request.form)
+        
+        pool = get_batch_pool()
+        futures = {
+            pool.submit(process_batch_item, filename, data, user_config): position
+            for position, (filename, data) in enumerate(documents)
+        }
+        
+        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        return Response(
+            stream_batch_results(futures, [filename for filename, _ in documents], user_config),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename=processed_batch_{timestamp}.zip'}
         )
         
+    except zipfile.BadZipFile:
+        return jsonify({'error': 'Invalid zip archive'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"Error in process_document: {e}")
-        print(traceback.format_exc())
-        return jsonify({'error': 'An unexpected error occurred during processing'}), 500
+        logger.exception("❌ Error in process_batch: %s", e)
+        return jsonify({'error': 'An unexpected error occurred during batch processing'}), 500
 
 @app.route('/analyze', methods=['POST'])
 def analyze_document():
     """Analyze document without processing (for preview)"""
+    context = None
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No file uploaded'}), 400
@@ -932,79 +3031,126 @@ def analyze_document():
             return jsonify({'error': 'Invalid file'}), 400
         
         # Get user configuration for analysis
-        user_config = {
-            'target_word_count': request.form.get('target_word_count'),
-            'keywords': [k.strip() for k in request.form.get('keywords', '').split(',') if k.strip()][:5],
-            'target_reading_level': request.form.get('target_reading_level'),
-            'is_medicare_page': request.form.get('is_medicare_page') == 'true'
-        }
+        user_config = parse_user_config(request.form)
         
-        # Convert numeric fields
-        if user_config['target_word_count']:
-            try:
-                user_config['target_word_count'] = int(user_config['target_word_count'])
-            except:
-                user_config['target_word_count'] = None
+        # Re-uploads of the same document and configuration are served from the cache
+        digest, size = hash_upload(file)
+        cache_key = ResultCache.make_key('analyze', digest, user_config, processor.rules_version)
+        cached_analysis = result_cache.get(cache_key)
+        if cached_analysis is not None:
+            return jsonify(cached_analysis)
         
-        if user_config['target_reading_level']:
-            try:
-                user_config['target_reading_level'] = float(user_config['target_reading_level'])
-            except:
-                user_config['target_reading_level'] = None
+        # Load document for analysis straight from the upload stream
+        context = ProcessingContext(user_config)
+        with context.timed('load'):
+            doc = Document(file.stream)
+            processor._document_index(doc, context)
         
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp:
-            file.save(temp.name)
-            temp_path = temp.name
+        # Get statistics
+        with context.timed('statistics'):
+            stats = processor.calculate_document_stats(doc, context)
         
-        try:
-            # Load document for analysis
-            doc = Document(temp_path)
-            processor.user_config = user_config
-            
-            # Get statistics
-            stats = processor.calculate_document_stats(doc)
-            
-            # Analyze keywords
-            keyword_analysis = {}
-            if user_config.get('keywords'):
-                keyword_analysis = processor._analyze_keywords(stats['full_text'], user_config['keywords'])
-            
-            # Check Medicare compliance
-            medicare_checks = []
-            if user_config.get('is_medicare_page'):
-                medicare_checks = processor._check_medicare_compliance(doc)
-            
-            # Count potential corrections (dry run)
-            correction_preview = processor.apply_corporate_rules(doc)
-            
-            os.unlink(temp_path)
-            
-            return jsonify({
-                'success': True,
-                'document_statistics': stats,
-                'potential_corrections': correction_preview['total_corrections'],
-                'corrections_preview': correction_preview['corrections_by_category'],
-                'keyword_analysis': keyword_analysis,
-                'medicare_checks': medicare_checks,
-                'user_config': user_config
-            })
-            
-        except Exception as e:
-            os.unlink(temp_path)
-            raise e
+        # Analyze keywords
+        keyword_analysis = {}
+        keyword_details = {}
+        if user_config.get('keywords'):
+            with context.timed('keywords'):
+                keyword_details = processor._analyze_keywords(doc, context)
+            keyword_analysis = {keyword: details['count'] for keyword, details in keyword_details.items()}
+        
+        # Check Medicare compliance
+        medicare_checks = []
+        if context.is_medicare_page:
+            with context.timed('medicare'):
+                medicare_checks = processor._check_medicare_compliance(doc, context)
+        
+        # Count potential corrections (dry run, the document is left untouched)
+        with context.timed('rules'):
+            correction_preview = processor.analyze_corporate_rules(doc, context)
+        
+        analysis = {
+            'success': True,
+            'document_statistics': stats,
+            'potential_corrections': correction_preview['total_corrections'],
+            'corrections_preview': correction_preview['corrections_by_category'],
+            'keyword_analysis': keyword_analysis,
+            'keyword_details': keyword_details,
+            'medicare_checks': medicare_checks,
+            'user_config': user_config
+        }
+        if context.profile is not None:
+            analysis['profile'] = context.profile.to_dict(context.rule_stats)
+        result_cache.put(cache_key, analysis)
+        
+        sample = context.metrics_sample()
+        record_document_metrics('analyze', True, sample, size)
+        response = jsonify(analysis)
+        response.headers['Server-Timing'] = server_timing(sample['stages'])
+        return response
             
     except Exception as e:
-        print(f"Error in analyze_document: {e}")
+        logger.exception("❌ Error in analyze_document: %s", e)
+        if context is not None:
+            record_document_metrics('analyze', False, context.metrics_sample())
         return jsonify({'error': 'Analysis failed'}), 500
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Report the status and progress of an async processing job"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    status = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'filename': job['filename'],
+        'created': datetime.datetime.fromtimestamp(job['created']).isoformat(),
+        'updated': datetime.datetime.fromtimestamp(job['updated']).isoformat()
+    }
+    if job['status'] == 'completed':
+        status['summary'] = job['summary']
+        status['result_url'] = url_for('job_result', job_id=job_id)
+    elif job['status'] == 'failed':
+        status['error'] = job['error']
+    return jsonify(status)
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """Download the processed document of a completed async job"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if job['status'] == 'failed':
+        return jsonify({'error': f"Processing failed: {job['error']}"}), 500
+    
+    if job['status'] != 'completed':
+        return jsonify({'error': 'Job is not complete yet', 'status': job['status']}), 409
+    
+    return send_file(
+        job_store.result_path(job_id),
+        as_attachment=True,
+        download_name=job['output_filename'],
+        mimetype='application/zip' if job['output_filename'].endswith('.zip')
+        else 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+    )
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics: document and stage latencies, document sizes and rule costs"""
+    return Response(metrics_store.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/health')
 def health_check():
     """Health check endpoint for deployment"""
     return jsonify({
         'status': 'healthy',
         'service': 'MVP Document Processor Enhanced',
-        'timestamp': datetime.datetime.now().isoformat()
+        'timestamp': datetime.datetime.now().isoformat(),
+        'rules_version': processor.rules_version,
+        'result_cache': result_cache.stats()
     })
 
 if __name__ == '__main__':
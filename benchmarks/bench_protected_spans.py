@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Protected Content Benchmark
+Compares the original five-pass placeholder extraction/restoration against the
+single-pass ProtectedSpanScanner on URL-heavy benefit page runs
+"""
+
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import PROTECTED_TLDS, ProtectedSpanScanner, split_protected
+
+URL_HEAVY_RUNS = [
+    "Find a doctor at www.mvphealthcare.com/find-a-doctor or call 1-800-666-1762.",
+    "Sign in at https://www.mvphealthcare.com/members [member portal] to view claims.",
+    "Learn more at mvphealthcare.com/medicare, medicare.gov and cms.hhs.gov today.",
+    "Visit <Insert URL> or ny.gov for the NY State of Health marketplace.",
+    "Download the Gia app from apps.apple.com or play.google.com/store [app badges].",
+    "Email questions to memberservices@mvphealthcare.com or see www.mvp.org/faq.",
+]
+
+PLAIN_RUNS = [
+    "Your plan covers 3 preventive visits each year at no cost to you.",
+    "Call us Monday through Friday, 8:00 am to 6:00 pm, with any questions.",
+]
+
+
+def extract_protected_legacy(text):
+    """The original extraction: one re.sub pass per content type, placeholders per match"""
+    all_placeholders = {}
+    counter = 0
+
+    def extract(match):
+        nonlocal counter
+        placeholder = f"PROTECTED_CONTENT_{counter}"
+        counter += 1
+        all_placeholders[placeholder] = match.group(0)
+        return placeholder
+
+    text = re.sub(r'<[^>]*>', extract, text)
+    text = re.sub(r'\[[^\]]*\]', extract, text)
+
+    url_patterns = [
+        r'https?://[^\s]+',
+        r'www\.[^\s]+',
+        r'\b[a-zA-Z0-9.-]+\.(' + '|'.join(PROTECTED_TLDS) + r')\b[^\s]*',
+    ]
+    for pattern in url_patterns:
+        text = re.sub(pattern, extract, text, flags=re.IGNORECASE)
+
+    for placeholder, original_content in all_placeholders.items():
+        text = text.replace(placeholder, original_content)
+    return text
+
+
+def join_protected(segments, protected):
+    """Reassemble text from split_protected output, stripping the segment marks"""
+    if not protected:
+        return segments[0]
+
+    last = len(segments) - 1
+    parts = []
+    for i, segment in enumerate(segments):
+        parts.append(segment[(1 if i else 0):(-1 if i < last else None)])
+        if i < last:
+            parts.append(protected[i])
+    return ''.join(parts)
+
+
+def extract_protected_scanner(scanner, text):
+    """The scanner path: find span offsets once, split and rejoin around them"""
+    segments, protected = split_protected(text, scanner.find_spans(text))
+    return join_protected(segments, protected)
+
+
+def main(number=2000):
+    scanner = ProtectedSpanScanner()
+
+    for label, runs in (('URL-heavy runs', URL_HEAVY_RUNS), ('Plain runs', PLAIN_RUNS)):
+        for text in runs:
+            assert extract_protected_scanner(scanner, text) == text
+
+        legacy = timeit.timeit(
+            lambda: [extract_protected_legacy(text) for text in runs], number=number)
+        scanned = timeit.timeit(
+            lambda: [extract_protected_scanner(scanner, text) for text in runs], number=number)
+
+        count = number * len(runs)
+        print(label)
+        print(f"  Five-pass extraction: {legacy / count * 1e6:8.2f} µs per run")
+        print(f"  Span scanner:         {scanned / count * 1e6:8.2f} µs per run")
+        print(f"  Speedup:              {legacy / scanned:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Rule Engine Benchmark
+Compares the per-run cost of the shipped rule pass (the compiled rule plan run by
+_iter_rule_edits over the text between protected spans) against the original
+dict-walking re.sub loop on representative run texts
+"""
+
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import MVPDocumentProcessor
+
+SAMPLE_RUNS = [
+    "Call 555-123-4567 from 9:00 A.M. - 5:00 P.M. Monday through Friday.",
+    "We offer 3 plans and 2 options in N.Y. and vt for healthcare members.",
+    "Our 12000 members use telehealth & login to see preventative care.",
+    "MVP health plans offer 4 tiers; log in to your account or log in now.",
+    "Office hours are 8am-4pm, and Gia can help you find 1 doctor.",
+    "Most members never need to call us, but we are here when you do.",
+]
+
+
+def apply_rules_legacy(rules, text):
+    """The original per-run loop: walk the rule dicts and call re.sub with pattern strings"""
+    for category_name, category_rules in rules.items():
+        if not isinstance(category_rules, list):
+            continue
+
+        for rule in category_rules:
+            if not isinstance(rule, dict) or not rule.get('enabled', True):
+                continue
+
+            find_pattern = rule.get('find', '')
+            replacement = rule.get('replace', '')
+            is_function = rule.get('is_function', False)
+
+            if not find_pattern:
+                continue
+
+            if is_function and callable(replacement):
+                new_text = re.sub(find_pattern, replacement, text, flags=re.IGNORECASE)
+            else:
+                flags = 0 if rule.get('case_sensitive', False) else re.IGNORECASE
+                new_text = re.sub(find_pattern, replacement, text, flags=flags)
+
+            if new_text != text:
+                text = new_text
+
+    return text
+
+
+def apply_rules_compiled(processor, rule_plan, text):
+    """The shipped rule pass: _iter_rule_edits yields each rule's edits, applied before the next rule"""
+    seconds = [0.0] * len(rule_plan)
+    for _, _, edits in processor._iter_rule_edits(text, rule_plan, seconds):
+        for start, end, replacement in reversed(edits):
+            text = text[:start] + replacement + text[end:]
+
+    return text
+
+
+def main(number=2000):
+    processor = MVPDocumentProcessor()
+
+    # Both paths must produce identical corrections before timing means anything
+    for text in SAMPLE_RUNS:
+        assert apply_rules_legacy(processor.rules, text) == apply_rules_compiled(processor, processor.rule_plan, text)
+
+    legacy = timeit.timeit(
+        lambda: [apply_rules_legacy(processor.rules, text) for text in SAMPLE_RUNS], number=number)
+    compiled = timeit.timeit(
+        lambda: [apply_rules_compiled(processor, processor.rule_plan, text) for text in SAMPLE_RUNS], number=number)
+
+    runs = number * len(SAMPLE_RUNS)
+    print(f"Legacy loop:   {legacy / runs * 1e6:8.2f} µs per run")
+    print(f"Rule pass:     {compiled / runs * 1e6:8.2f} µs per run")
+    print(f"Speedup:       {legacy / compiled:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
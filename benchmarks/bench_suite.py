@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+Times the processing pipeline on the synthetic corpus: MVPDocumentProcessor.process_document
+as a whole, its apply_corporate_rules, calculate_document_stats and _create_analysis_report
+stages (from the stage timers process_document records), and the /process and /analyze
+routes through the Flask test client.
+
+Results can be written as JSON and compared with a baseline from an earlier commit:
+
+    python benchmarks/bench_suite.py --json before.json
+    python benchmarks/bench_suite.py --baseline before.json --threshold 0.15
+
+The comparison exits with status 1 if any median got slower than the threshold allows.
+"""
+
+import argparse
+import datetime
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the result cache from answering repeated uploads, and job and metrics state
+# out of the real job directory
+os.environ['RESULT_CACHE_MAX_MB'] = '0'
+os.environ.setdefault('JOB_DIR', tempfile.mkdtemp(prefix='mvp-bench-'))
+
+import app
+from corpus import CORPUS, build_document, user_config
+
+RESULTS_VERSION = 1
+
+# Stage timers recorded by process_document, reported under the function they time
+STAGES = {
+    'load': 'load',
+    'statistics': 'calculate_document_stats',
+    'rules': 'apply_corporate_rules',
+    'report': '_create_analysis_report',
+    'save': 'save',
+}
+
+
+def clear_caches():
+    """Forget per-text caches, so every run pays for a document never seen before
+
+    Collecting garbage up front keeps one run's leftovers from being collected in the next.
+    """
+    app.paragraph_stats.cache_clear()
+    app.keyword_scanner.cache_clear()
+    gc.collect()
+
+
+def form_fields(config, data):
+    fields = {key: value for key, value in config.items() if key != 'keywords' and value is not None}
+    fields['keywords'] = ', '.join(config['keywords'])
+    fields['is_medicare_page'] = 'true' if config['is_medicare_page'] else 'false'
+    fields['profile'] = 'false'
+    fields['file'] = (io.BytesIO(data), 'benchmark.docx')
+    return fields
+
+
+def time_document(spec, number):
+    """Seconds per run for every target on one corpus document, after one untimed warm-up run"""
+    data = build_document(spec)
+    config = user_config(spec)
+    client = app.app.test_client()
+    timings = {target: [] for target in ['process_document', *STAGES.values(), 'route /process', 'route /analyze']}
+
+    for run in range(number + 1):
+        if run == 1:
+            for runs in timings.values():
+                runs.clear()
+
+        clear_caches()
+        start = time.perf_counter()
+        results = app.processor.process_document(io.BytesIO(data), io.BytesIO(), config)
+        timings['process_document'].append(time.perf_counter() - start)
+        assert results['success'], results.get('error')
+        for stage, target in STAGES.items():
+            timings[target].append(results['metrics']['stages'][stage])
+
+        for route in ('/process', '/analyze'):
+            clear_caches()
+            start = time.perf_counter()
+            response = client.post(route, data=form_fields(config, data), content_type='multipart/form-data')
+            response.get_data()
+            timings[f'route {route}'].append(time.perf_counter() - start)
+            assert response.status_code == 200, response.get_data(as_text=True)
+
+    return {
+        target: {
+            'median_ms': statistics.median(runs) * 1e3,
+            'min_ms': min(runs) * 1e3,
+            'mean_ms': statistics.mean(runs) * 1e3,
+            'runs': len(runs)
+        }
+        for target, runs in timings.items()
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Print each timing against the baseline, returning the targets that regressed"""
+    regressions = []
+    for name, timing in results['timings'].items():
+        previous = baseline['timings'].get(name)
+        if previous is None:
+            continue
+        change = timing['median_ms'] / previous['median_ms'] - 1 if previous['median_ms'] else 0
+        regressed = change > threshold and timing['median_ms'] - previous['median_ms'] > min_delta_ms
+        if regressed:
+            regressions.append(name)
+        print(f"{name:45} {previous['median_ms']:10.2f} {timing['median_ms']:10.2f} ms {change:+8.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=5, help='runs per document and target (default: 5)')
+    parser.add_argument('--only', nargs='+', metavar='NAME', help='corpus documents to run (default: all)')
+    parser.add_argument('--json', metavar='PATH', help='write results as JSON')
+    parser.add_argument('--baseline', metavar='PATH', help='compare medians with an earlier JSON result')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='slowdown of a median that counts as a regression (default: 0.15)')
+    parser.add_argument('--min-delta', type=float, default=1.0,
+                        help='ignore slowdowns smaller than this many milliseconds (default: 1.0)')
+    args = parser.parse_args()
+
+    specs = [spec for spec in CORPUS if not args.only or spec.name in args.only]
+    results = {
+        'version': RESULTS_VERSION,
+        'revision': git_revision(),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'xml_fast_path': app.processor.xml_fast_path,
+        'number': args.number,
+        'timings': {}
+    }
+
+    for spec in specs:
+        for target, timing in time_document(spec, args.number).items():
+            name = f'{spec.name}/{target}'
+            results['timings'][name] = timing
+            print(f"{name:45} {timing['median_ms']:10.2f} ms median  {timing['min_ms']:10.2f} ms min")
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(results, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"\nAgainst {args.baseline} (revision {baseline.get('revision')}):")
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\nNo regressions over {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
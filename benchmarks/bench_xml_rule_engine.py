@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+XML Rule Engine Benchmark
+Checks that the XML fast path of apply_corporate_rules writes exactly the same
+document XML as the python-docx reference path, then compares their cost on a
+large document fragmented into many small runs
+"""
+
+import contextlib
+import io
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from lxml import etree
+
+from app import MVPDocumentProcessor, ProcessingContext
+
+SAMPLE_PARAGRAPHS = [
+    "Call 555-123-4567 from 9:00 A.M. - 5:00 P.M. Monday through Friday.",
+    "We offer 3 plans and 2 options in N.Y. and vt for healthcare members.",
+    "Our 12000 members use telehealth & login to see preventative care.",
+    "MVP health plans offer 4 tiers; log in to your account or log in now.",
+    "Office hours are 8am-4pm, and Gia can help you find 1 doctor.",
+    "Visit www.mvphealthcare.com or [Insert URL] to  learn more\tabout healthcare.",
+    "Most members never need to call us, but we are here when you do.",
+]
+
+
+def build_document(paragraphs=2000, seed=0):
+    """A document whose paragraphs and table cells are split into runs of 1-12 characters"""
+    rng = random.Random(seed)
+    doc = Document()
+    table = doc.add_table(rows=paragraphs // 20, cols=2)
+    cells = [cell for row in table.rows for cell in row.cells]
+
+    for i in range(paragraphs):
+        paragraph = cells[i % len(cells)].add_paragraph() if i % 4 == 0 else doc.add_paragraph()
+        text = rng.choice(SAMPLE_PARAGRAPHS)
+        position = 0
+        while position < len(text):
+            size = rng.randint(1, 12)
+            run = paragraph.add_run(text[position:position + size])
+            run.bold = rng.random() < 0.2
+            position += size
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def document_xml(doc):
+    return etree.tostring(doc.element)
+
+
+def apply_rules(processor, data):
+    doc = Document(io.BytesIO(data))
+    context = ProcessingContext()
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Build the paragraph index outside the timed rule pass
+        processor._document_index(doc, context)
+        results = processor.apply_corporate_rules(doc, context)
+    return doc, results
+
+
+def main(number=3):
+    data = build_document()
+    reference = MVPDocumentProcessor()
+    fast = MVPDocumentProcessor(xml_fast_path=True)
+
+    # The fast path must write byte-identical XML before timing means anything
+    reference_doc, reference_results = apply_rules(reference, data)
+    fast_doc, fast_results = apply_rules(fast, data)
+    assert document_xml(reference_doc) == document_xml(fast_doc)
+    assert reference_results['total_corrections'] == fast_results['total_corrections']
+    assert reference_results['corrections_by_category'] == fast_results['corrections_by_category']
+
+    documents = [Document(io.BytesIO(data)) for _ in range(2 * number)]
+    contexts = [ProcessingContext() for _ in documents]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for doc, context in zip(documents, contexts):
+            reference._document_index(doc, context)
+        pairs = iter(zip(documents, contexts))
+        python_docx = timeit.timeit(lambda: reference.apply_corporate_rules(*next(pairs)), number=number)
+        xml = timeit.timeit(lambda: fast.apply_corporate_rules(*next(pairs)), number=number)
+
+    print(f"Corrections:      {reference_results['total_corrections']} (identical XML)")
+    print(f"python-docx path: {python_docx / number * 1e3:8.1f} ms per document")
+    print(f"XML fast path:    {xml / number * 1e3:8.1f} ms per document")
+    print(f"Speedup:          {python_docx / xml:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Synthetic .docx Corpus
+Builds representative benefit page documents with python-docx, varying paragraph
+count, run fragmentation, URL and phone number density, tables, images and Medicare
+markers. Run directly to write the corpus to a directory:
+
+    python benchmarks/corpus.py corpus/
+"""
+
+import io
+import os
+import random
+import struct
+import sys
+import zlib
+from collections import namedtuple
+
+from docx import Document
+from docx.shared import Inches
+
+# fragmentation is the average run length in characters (0 keeps each paragraph in one
+# run); url_density and phone_density are the share of sentences carrying one
+DocumentSpec = namedtuple('DocumentSpec', [
+    'name', 'paragraphs', 'fragmentation', 'url_density', 'phone_density', 'tables', 'images', 'medicare'
+])
+
+CORPUS = (
+    DocumentSpec('small', 30, 0, 0.1, 0.1, 0, 0, False),
+    DocumentSpec('medium', 300, 0, 0.2, 0.1, 2, 2, False),
+    DocumentSpec('large', 3000, 0, 0.2, 0.1, 10, 5, False),
+    DocumentSpec('fragmented', 500, 4, 0.2, 0.1, 2, 0, False),
+    DocumentSpec('url_heavy', 500, 0, 0.9, 0.1, 0, 0, False),
+    DocumentSpec('medicare', 500, 0, 0.2, 0.5, 2, 1, True),
+)
+
+KEYWORDS = ['health care', 'members', 'virtual care', 'plan']
+
+# Sentences that trigger the corporate rules, and neutral filler around them
+RULE_SENTENCES = [
+    "Call us from {hour}:00 A.M. - {late}:00 P.M. Monday through Friday.",
+    "We offer {digit} plans and {digit} options in N.Y. and vt for healthcare members.",
+    "Our {large} members use telehealth & login to see preventative care.",
+    "MVP health plans offer {digit} tiers; log in to your account today.",
+    "Office hours are {hour}am-{late}pm, and Gia can help you find {digit} doctor.",
+    "Most members never need to call us,  but we are here when you do.",
+]
+FILLER_SENTENCES = [
+    "Your plan covers preventive visits each year at no cost to you.",
+    "Members can choose a primary care provider from our network.",
+    "Coverage details are listed in your Evidence of Coverage document.",
+    "Virtual care visits are available for many common conditions.",
+]
+URLS = [
+    "www.mvphealthcare.com/find-a-doctor", "https://www.mvphealthcare.com/members [member portal]",
+    "mvphealthcare.com/medicare", "medicare.gov", "<Insert URL>", "apps.apple.com",
+]
+PHONES = ["1-800-666-1762", "(800) 665-7924", "518.388.2500", "1-877-838-0888 (TTY 711)"]
+
+
+def png_image(width=64, height=64, seed=0):
+    """A small solid-color PNG, so documents carry real image parts"""
+    color = bytes(random.Random(seed).randrange(256) for _ in range(3))
+    raw = b''.join(b'\x00' + color * width for _ in range(height))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b'')
+
+
+def sentence(rng, spec):
+    """One sentence of benefit page copy, with URLs and phone numbers at the spec's density"""
+    template = rng.choice(RULE_SENTENCES if rng.random() < 0.5 else FILLER_SENTENCES)
+    text = template.format(hour=rng.randint(7, 10), late=rng.randint(4, 8), digit=rng.randint(1, 9),
+                           large=rng.choice((1200, 12000, 250000)))
+    if rng.random() < spec.url_density:
+        text += f" Visit {rng.choice(URLS)} to learn more."
+    if rng.random() < spec.phone_density:
+        text += f" Call {rng.choice(PHONES)} with questions."
+    if rng.random() < 0.2:
+        text += f" Ask about {rng.choice(KEYWORDS)}."
+    return text
+
+
+def add_text(paragraph, text, rng, fragmentation):
+    """Add text to a paragraph, split into runs of about fragmentation characters"""
+    if not fragmentation:
+        paragraph.add_run(text)
+        return
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 2 * fragmentation - 1)
+        run = paragraph.add_run(text[position:position + size])
+        run.bold = rng.random() < 0.1
+        position += size
+
+
+def build_document(spec, seed=0):
+    """The .docx bytes of a synthetic document built to spec"""
+    rng = random.Random(f'{spec.name}-{seed}')
+    doc = Document()
+    doc.add_heading(f'{spec.name.replace("_", " ").title()} Benefits', level=1)
+    doc.add_paragraph('start_page_copy')
+
+    # Tables and images are spread evenly through the body
+    table_at = {round((i + 1) * spec.paragraphs / (spec.tables + 1)) for i in range(spec.tables)}
+    image_at = {round((i + 0.5) * spec.paragraphs / spec.images) for i in range(spec.images)}
+
+    for i in range(spec.paragraphs):
+        if i % 12 == 0:
+            doc.add_heading(sentence(rng, spec)[:60], level=2)
+        text = ' '.join(sentence(rng, spec) for _ in range(rng.randint(1, 4)))
+        add_text(doc.add_paragraph(), text, rng, spec.fragmentation)
+
+        if i in table_at:
+            table = doc.add_table(rows=6, cols=3)
+            for cell in (cell for row in table.rows for cell in row.cells):
+                add_text(cell.paragraphs[0], sentence(rng, spec), rng, spec.fragmentation)
+        if i in image_at:
+            doc.add_picture(io.BytesIO(png_image(seed=i)), width=Inches(1.5))
+
+    doc.add_paragraph('end_page_copy')
+    if spec.medicare:
+        doc.add_paragraph('start_disclaimer')
+        doc.add_paragraph('MVP Health Care is an HMO-POS and PPO plan with a Medicare contract. '
+                          'Enrollment depends on contract renewal.')
+        doc.add_paragraph('Y0051_1234_M')
+        doc.add_paragraph('end_disclaimer')
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def user_config(spec):
+    """The configuration a document built to spec is processed with"""
+    return {
+        'target_word_count': spec.paragraphs * 40,
+        'keywords': KEYWORDS,
+        'target_reading_level': 8.0,
+        'is_medicare_page': spec.medicare,
+        'report': 'append',
+        'profile': False
+    }
+
+
+def main(directory):
+    os.makedirs(directory, exist_ok=True)
+    for spec in CORPUS:
+        data = build_document(spec)
+        path = os.path.join(directory, f'{spec.name}.docx')
+        with open(path, 'wb') as output:
+            output.write(data)
+        print(f"{path}: {len(data) / 1024:.0f} KB")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else 'corpus')
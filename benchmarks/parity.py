@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Rule Pipeline Parity Harness
+Runs a reference and a candidate rule engine over the synthetic corpus and over
+fuzz-generated paragraphs split into random runs, and diffs the resulting run texts,
+correction counts and corrections by category. The first mismatch is minimized to
+the fewest paragraphs, runs and characters that still show it.
+
+An engine is a git revision, or '.' for the working tree, with an optional +xml to
+use the XML fast path:
+
+    python benchmarks/parity.py                          # HEAD against the working tree
+    python benchmarks/parity.py --candidate .+xml        # working tree, python-docx path against XML fast path
+    python benchmarks/parity.py --reference HEAD~3 --cases 10000
+
+Exits with status 1 on a mismatch.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import random
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from collections import namedtuple
+
+from docx import Document
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
+
+from corpus import CORPUS, build_document, user_config
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What a rule pass produced: the text of every run, paragraph by paragraph
+Outcome = namedtuple('Outcome', ['run_texts', 'total_corrections', 'corrections_by_category'])
+
+# The first way two outcomes differ; minimizing keeps the kind, so it cannot wander off
+# to a different mismatch on the way down
+Mismatch = namedtuple('Mismatch', ['kind', 'detail'])
+
+# Fuzz paragraphs are built from rule triggers, protected content and the characters
+# the engines treat specially, joined by assorted separators
+FUZZ_TOKENS = [
+    '9:00', '10:30', '12:00', 'A.M.', 'a.m.', 'PM', 'p.m', 'am', '8am-4pm', '9:00 AM - 5:00 PM', '9 - 5',
+    '1', '2', '3', '7', '9', '10', '12', '1000', '25000', '1,500', '3rd', '4th', '5%', '2025', 'ext. 1234',
+    'N.Y.', 'n.y.', 'vt', 'V.T.', 'ct', 'ny', 'healthcare', 'Healthcare', 'telehealth', 'login', 'log in',
+    'preventative', 'Gia', 'Gia®', 'MVP', 'MVP Health Care', 'health plans', '&', '& ',
+    'www.mvphealthcare.com/find', 'https://mvp.org/a?b=1&c=2', 'mvphealthcare.com', 'medicare.gov',
+    '[link to 5 plans]', '[Insert URL]', '<insert 3 items>', '<b>', '[', '<',
+    '555-123-4567', '1-800-666-1762', '(800) 665-7924', '(TTY 711)', 'Y0051_1234_M',
+    'PROTECTED_CONTENT_0', 'NUMBER_WORD_3', 'ǂ', 'é', 'care', 'members', 'plan',
+    '.', ',', ';', ':', '-', '–', '(', ')', '"',
+]
+FUZZ_SEPARATORS = [' ', ' ', ' ', '', '  ', '\t', ' - ', ', ']
+
+
+class Engine:
+    """A rule engine: MVPDocumentProcessor loaded from a git revision or the working tree"""
+
+    def __init__(self, spec, number):
+        source, _, option = spec.partition('+')
+        if option not in ('', 'xml'):
+            raise SystemExit(f"Unknown engine option '+{option}' in {spec}")
+        self.spec = spec
+        self.xml_fast_path = option == 'xml'
+
+        if source == '.':
+            path = os.path.join(REPO_DIR, 'app.py')
+        else:
+            tree = tempfile.mkdtemp(prefix='mvp-parity-')
+            archive = subprocess.run(['git', 'archive', source], cwd=REPO_DIR, capture_output=True)
+            if archive.returncode:
+                raise SystemExit(f"Cannot load {source}: {archive.stderr.decode().strip()}")
+            with tarfile.open(fileobj=io.BytesIO(archive.stdout)) as tar:
+                tar.extractall(tree)
+            path = os.path.join(tree, 'app.py')
+
+        module_spec = importlib.util.spec_from_file_location(f'parity_engine_{number}', path)
+        self.module = importlib.util.module_from_spec(module_spec)
+        with contextlib.redirect_stdout(io.StringIO()):
+            module_spec.loader.exec_module(self.module)
+        self.processor = self._processor()
+
+    def _processor(self):
+        if self.xml_fast_path:
+            return self.module.MVPDocumentProcessor(xml_fast_path=True)
+        return self.module.MVPDocumentProcessor()
+
+    def apply(self, data, config):
+        """Run apply_corporate_rules on a .docx and return its Outcome"""
+        doc = Document(io.BytesIO(data))
+        with contextlib.redirect_stdout(io.StringIO()):
+            if hasattr(self.module, 'ProcessingContext'):
+                results = self.processor.apply_corporate_rules(doc, self.module.ProcessingContext(config))
+            else:
+                # Engines from before ProcessingContext keep request state on the processor
+                processor = self._processor()
+                processor.user_config = config
+                results = processor.apply_corporate_rules(doc)
+
+        categories = {category: count for category, count in results['corrections_by_category'].items() if count}
+        return Outcome(run_texts(doc), results['total_corrections'], categories)
+
+
+def run_texts(doc):
+    """The text of every run of every paragraph, table cells included, in document order"""
+    return [[run.text for run in Paragraph(p, None).runs] for p in doc.element.body.iter(qn('w:p'))]
+
+
+def build_docx(paragraphs):
+    """The .docx bytes of a document with one paragraph per list of run texts"""
+    doc = Document()
+    for runs in paragraphs:
+        paragraph = doc.add_paragraph()
+        for text in runs:
+            paragraph.add_run(text)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def diff_outcomes(reference, candidate):
+    """Describe the first difference between two outcomes, or None if they match"""
+    for i, (expected, actual) in enumerate(zip(reference.run_texts, candidate.run_texts)):
+        if expected != actual:
+            return Mismatch('run texts', f"paragraph {i}\n  reference: {expected!r}\n  candidate: {actual!r}")
+    if len(reference.run_texts) != len(candidate.run_texts):
+        return Mismatch('paragraph count', f"{len(reference.run_texts)} against {len(candidate.run_texts)}")
+    if reference.corrections_by_category != candidate.corrections_by_category:
+        categories = sorted(set(reference.corrections_by_category) | set(candidate.corrections_by_category))
+        changed = [f"{category}: {reference.corrections_by_category.get(category, 0)} against "
+                   f"{candidate.corrections_by_category.get(category, 0)}"
+                   for category in categories
+                   if reference.corrections_by_category.get(category) != candidate.corrections_by_category.get(category)]
+        return Mismatch('corrections by category', '\n  ' + '\n  '.join(changed))
+    if reference.total_corrections != candidate.total_corrections:
+        return Mismatch('total corrections', f"{reference.total_corrections} against {candidate.total_corrections}")
+    return None
+
+
+def compare(reference, candidate, data, config):
+    return diff_outcomes(reference.apply(data, config), candidate.apply(data, config))
+
+
+def shrink_list(items, still_fails):
+    """Drop ever smaller chunks of items while still_fails(items) holds (a simple ddmin)"""
+    chunk = len(items) // 2
+    while chunk >= 1:
+        i = 0
+        while i < len(items):
+            trial = items[:i] + items[i + chunk:]
+            if trial and still_fails(trial):
+                items = trial
+            else:
+                i += chunk
+        chunk //= 2
+    return items
+
+
+def minimize(paragraphs, still_fails):
+    """Shrink a failing case to the fewest paragraphs, then runs, then characters"""
+    paragraphs = shrink_list([list(runs) for runs in paragraphs], still_fails)
+
+    for i in range(len(paragraphs)):
+        def with_runs(runs):
+            return paragraphs[:i] + [runs] + paragraphs[i + 1:]
+        paragraphs[i] = shrink_list(paragraphs[i], lambda runs: still_fails(with_runs(runs)))
+
+        for j in range(len(paragraphs[i])):
+            def with_text(characters):
+                runs = list(paragraphs[i])
+                runs[j] = ''.join(characters)
+                return with_runs(runs)
+            paragraphs[i][j] = ''.join(shrink_list(list(paragraphs[i][j]), lambda chars: still_fails(with_text(chars))))
+    return paragraphs
+
+
+def fuzz_paragraph(rng):
+    """Random paragraph text from FUZZ_TOKENS, split into one to six runs at random offsets"""
+    text = ''.join(rng.choice(FUZZ_TOKENS) + rng.choice(FUZZ_SEPARATORS) for _ in range(rng.randint(1, 16)))
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(0, 5)))) if len(text) > 1 else []
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+def report_mismatch(reference, candidate, name, paragraphs, config, mismatch):
+    """Print a mismatch and its minimized reproducer"""
+    print(f"\nMISMATCH in {name}: {mismatch.kind} differ: {mismatch.detail}")
+
+    def still_fails(trial):
+        difference = compare(reference, candidate, build_docx(trial), config)
+        return difference is not None and difference.kind == mismatch.kind
+
+    if not still_fails(paragraphs):
+        print("(Not reproducible from the paragraph texts alone, so not minimized)")
+        return
+
+    started = time.perf_counter()
+    paragraphs = minimize(paragraphs, still_fails)
+    data = build_docx(paragraphs)
+    expected, actual = reference.apply(data, config), candidate.apply(data, config)
+    print(f"\nMinimized reproducer ({time.perf_counter() - started:.1f}s), "
+          f"is_medicare_page={config.get('is_medicare_page', False)}:")
+    print(f"    paragraphs = {paragraphs!r}")
+    print("  {} differ: {}".format(*diff_outcomes(expected, actual)))
+    for label, outcome in (('reference', expected), ('candidate', actual)):
+        print(f"  {label} ({outcome.total_corrections} corrections): {outcome.corrections_by_category}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reference', default='HEAD', help="reference engine (default: HEAD)")
+    parser.add_argument('--candidate', default='.', help="candidate engine (default: . for the working tree)")
+    parser.add_argument('--cases', type=int, default=2000, help='fuzz paragraphs to check (default: 2000)')
+    parser.add_argument('--batch', type=int, default=100, help='fuzz paragraphs per document (default: 100)')
+    parser.add_argument('--seed', type=int, default=0, help='fuzz seed (default: 0)')
+    parser.add_argument('--corpus-dir', help='also check every .docx in this directory')
+    args = parser.parse_args()
+
+    # Each engine reads the rule packs shipped with its own revision
+    os.environ.pop('RULES_DIR', None)
+    os.environ.setdefault('JOB_DIR', tempfile.mkdtemp(prefix='mvp-parity-'))
+    reference = Engine(args.reference, 0)
+    candidate = Engine(args.candidate, 1)
+    print(f"Reference: {args.reference}  Candidate: {args.candidate}")
+
+    # Corpus documents, with the configuration they were built for
+    documents = [(spec.name, build_document(spec), user_config(spec)) for spec in CORPUS]
+    if args.corpus_dir:
+        for filename in sorted(os.listdir(args.corpus_dir)):
+            if filename.endswith('.docx'):
+                with open(os.path.join(args.corpus_dir, filename), 'rb') as document:
+                    data = document.read()
+                for medicare in (False, True):
+                    documents.append((filename, data, {'keywords': [], 'is_medicare_page': medicare}))
+
+    for name, data, config in documents:
+        difference = compare(reference, candidate, data, config)
+        if difference:
+            paragraphs = run_texts(Document(io.BytesIO(data)))
+            report_mismatch(reference, candidate, name, paragraphs, config, difference)
+            sys.exit(1)
+    print(f"Corpus: {len(documents)} documents identical")
+
+    rng = random.Random(args.seed)
+    checked = 0
+    while checked < args.cases:
+        paragraphs = [fuzz_paragraph(rng) for _ in range(min(args.batch, args.cases - checked))]
+        config = {'keywords': [], 'is_medicare_page': rng.random() < 0.5}
+        difference = compare(reference, candidate, build_docx(paragraphs), config)
+        if difference:
+            report_mismatch(reference, candidate, f'fuzz cases {checked}-{checked + len(paragraphs) - 1}',
+                            paragraphs, config, difference)
+            sys.exit(1)
+        checked += len(paragraphs)
+    print(f"Fuzz: {checked} paragraphs identical (seed {args.seed})")
+
+
+if __name__ == '__main__':
+    main()
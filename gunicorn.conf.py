@@ -9,7 +9,10 @@ backlog = 2048
 
 # Worker processes
 workers = 2
-worker_class = "sync"
+# The shared processor keeps no per-request state, so each worker can serve
+# several documents at once on threads
+worker_class = "gthread"
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
 worker_connections = 1000
 timeout = 30
 keepalive = 2
@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+# Importing app creates its job, metrics and rule cache stores, so keep them out of
+# the shared temp directories a running instance uses
+TEST_DIR = tempfile.mkdtemp(prefix='mvp-tests-')
+os.environ['JOB_DIR'] = TEST_DIR
+os.environ['RULES_CACHE_DIR'] = os.path.join(TEST_DIR, 'rules')
+os.environ.pop('RULES_DIR', None)
+os.environ.pop('RESULT_CACHE_DIR', None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
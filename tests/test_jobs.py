@@ -0,0 +1,108 @@
+import io
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from app import JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path), 3600, 2)
+
+
+@pytest.fixture
+def dead_pid():
+    """The id of a process that has exited"""
+    return int(subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                              capture_output=True, text=True, check=True).stdout)
+
+
+def queue(store, name='doc.docx'):
+    return store.create(name, io.BytesIO(b'docx bytes'), {'keywords': []})
+
+
+def test_claim_marks_the_job_processing_by_this_process(store):
+    job_id = queue(store)
+    assert store.get(job_id)['status'] == 'queued'
+
+    job = store.claim()
+    assert job['id'] == job_id
+    assert job['status'] == 'processing'
+    assert job['worker'] == os.getpid()
+    assert job['attempts'] == 1
+    assert job['user_config'] == {'keywords': []}
+    assert store.claim() is None
+    assert not store.has_queued()
+
+
+def test_claims_take_the_oldest_job_first(store):
+    first, second = queue(store, 'first.docx'), queue(store, 'second.docx')
+    store.update(first, created=1000.0)
+    store.update(second, created=900.0)
+    assert [store.claim()['id'], store.claim()['id']] == [second, first]
+
+
+def test_concurrent_claims_never_share_a_job(store):
+    job_ids = {queue(store) for _ in range(20)}
+    claimed = []
+
+    def work():
+        while True:
+            job = store.claim()
+            if job is None:
+                return
+            claimed.append(job['id'])
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(job_ids)
+
+
+def test_recover_requeues_jobs_of_an_exited_worker(store, dead_pid):
+    job_id = queue(store)
+    store.claim()
+    store.update(job_id, worker=dead_pid)
+
+    store.recover()
+    job = store.get(job_id)
+    assert job['status'] == 'queued'
+    assert job['worker'] is None
+    assert store.claim()['attempts'] == 2
+
+
+def test_recover_fails_jobs_out_of_attempts(store, dead_pid):
+    job_id = queue(store)
+    store.update(job_id, status='processing', worker=dead_pid, attempts=2)
+
+    store.recover()
+    job = store.get(job_id)
+    assert job['status'] == 'failed'
+    assert job['error'] == 'The worker processing this job stopped'
+    assert not os.path.exists(store.input_path(job_id))
+
+
+def test_recover_fails_streamed_jobs_of_an_exited_worker(store, dead_pid):
+    job_id = store.create('doc.docx', None, {'keywords': []})
+    assert store.get(job_id)['worker'] == os.getpid()
+    store.update(job_id, worker=dead_pid)
+
+    store.recover()
+    assert store.get(job_id)['status'] == 'failed'
+
+
+def test_recover_leaves_jobs_of_running_workers_alone(store):
+    job_id = queue(store)
+    store.claim()
+
+    store.recover()
+    job = store.get(job_id)
+    assert job['status'] == 'processing'
+    assert job['attempts'] == 1
+    assert os.path.exists(store.input_path(job_id))
@@ -0,0 +1,60 @@
+import io
+import random
+import re
+
+from docx import Document
+
+import app
+from app import KeywordScanner
+
+
+def findall(keywords, text):
+    """What one re.findall per keyword finds, as sorted (keyword, start) pairs"""
+    return sorted((keyword, match.start()) for keyword in keywords
+                  for match in re.finditer(r'\b' + re.escape(keyword) + r'\b', text))
+
+
+def test_whole_words_only():
+    scanner = KeywordScanner(['plan', 'care'])
+    assert list(scanner.finditer('plans care plan healthcare')) == [('care', 6), ('plan', 11)]
+
+
+def test_different_keywords_may_overlap():
+    scanner = KeywordScanner(['medicare', 'medicare advantage', 'advantage'])
+    assert sorted(scanner.finditer('medicare advantage plans')) == [
+        ('advantage', 9), ('medicare', 0), ('medicare advantage', 0)]
+
+
+def test_occurrences_of_one_keyword_do_not_overlap():
+    assert list(KeywordScanner(['la la']).finditer('la la la')) == [('la la', 0)]
+    assert list(KeywordScanner(['la la']).finditer('la la la la')) == [('la la', 0), ('la la', 6)]
+
+
+def test_matches_one_findall_per_keyword():
+    rng = random.Random(0)
+    words = ['la', 'a', 'b', 'ab', 'a b', 'la la', 'b a b']
+    for _ in range(2000):
+        keywords = rng.sample(words, rng.randint(1, 4))
+        text = ''.join(rng.choice(['la', 'a', 'b', ' ', ' ', '-', 'x']) for _ in range(rng.randint(0, 20)))
+        assert sorted(KeywordScanner(keywords).finditer(text)) == findall(keywords, text), (keywords, text)
+
+
+def test_offsets_are_into_the_original_text_when_lowering_changes_its_length():
+    scanner = KeywordScanner(['intro'])
+    assert list(scanner.find_in_paragraphs(['İİİİ intro', 'Intro'])) == [('intro', 0, 5), ('intro', 1, 0)]
+
+
+def test_analyze_keywords_counts_and_locates_hits():
+    doc = Document()
+    doc.add_paragraph('İİİİ intro to Medicare')
+    doc.add_paragraph('la la la')
+    buffer = io.BytesIO()
+    doc.save(buffer)
+
+    doc = Document(io.BytesIO(buffer.getvalue()))
+    context = app.ProcessingContext({'keywords': ['Intro', 'medicare', 'la la']})
+    details = app.processor._analyze_keywords(doc, context)
+    assert details['Intro']['count'] == 1
+    assert [(hit['paragraph'], hit['start']) for hit in details['Intro']['positions']] == [(0, 5)]
+    assert [(hit['paragraph'], hit['start']) for hit in details['medicare']['positions']] == [(0, 14)]
+    assert details['la la']['count'] == 1
@@ -0,0 +1,94 @@
+import io
+import struct
+import zipfile
+import zlib
+
+from docx import Document
+
+from app import ZIP_LOCAL_HEADER, save_document
+
+
+def png_bytes(pixel=b'\x00\xff\x00'):
+    """A 1x1 RGB PNG, enough for python-docx to add as a picture"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    header = struct.pack('>IIBBBBB', 1, 1, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(b'\x00' + pixel)) + chunk(b'IEND', b''))
+
+
+def source_document():
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = 'Header text'
+    doc.add_paragraph('Body text')
+    doc.add_picture(io.BytesIO(png_bytes()))
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer
+
+
+def raw_entries(data):
+    """Each entry's name, compression method, CRC and compressed bytes, read straight from the zip"""
+    fp = io.BytesIO(data)
+    entries = {}
+    with zipfile.ZipFile(fp) as package:
+        for info in package.infolist():
+            fp.seek(info.header_offset)
+            name_length, extra_length = ZIP_LOCAL_HEADER.unpack(fp.read(ZIP_LOCAL_HEADER.size))[-2:]
+            fp.seek(info.header_offset + ZIP_LOCAL_HEADER.size + name_length + extra_length)
+            entries[info.filename] = (info.compress_type, info.CRC, fp.read(info.compress_size))
+    return entries
+
+
+def test_untouched_parts_are_copied_raw_and_edited_parts_rewritten():
+    source = source_document()
+    doc = Document(source)
+    doc.paragraphs[0].text = 'Edited body text'
+
+    output = io.BytesIO()
+    save_document(doc, source, output, {doc.part})
+
+    before = raw_entries(source.getvalue())
+    after = raw_entries(output.getvalue())
+    assert set(after) == set(before)
+    media = [name for name in before if name.startswith('word/media/')]
+    assert media
+    for name in media + ['word/styles.xml', 'word/header1.xml', '[Content_Types].xml']:
+        assert after[name] == before[name], name
+    assert after['word/document.xml'] != before['word/document.xml']
+
+    saved = Document(output)
+    assert saved.paragraphs[0].text == 'Edited body text'
+    assert saved.sections[0].header.paragraphs[0].text == 'Header text'
+    assert len(saved.inline_shapes) == 1
+
+
+def test_modified_header_is_rewritten():
+    source = source_document()
+    doc = Document(source)
+    header = doc.sections[0].header
+    header.paragraphs[0].text = 'New header'
+
+    output = io.BytesIO()
+    save_document(doc, source, output, {doc.part, header.part})
+
+    before = raw_entries(source.getvalue())
+    after = raw_entries(output.getvalue())
+    assert after['word/header1.xml'] != before['word/header1.xml']
+    assert Document(output).sections[0].header.paragraphs[0].text == 'New header'
+
+
+def test_added_parts_fall_back_to_a_full_save():
+    source = source_document()
+    doc = Document(source)
+    # A second, different picture adds a new media part to the package
+    doc.add_picture(io.BytesIO(png_bytes(b'\x00\x00\xff')))
+
+    output = io.BytesIO()
+    save_document(doc, source, output, {doc.part})
+
+    saved = Document(output)
+    assert len(saved.inline_shapes) == 2
+    with zipfile.ZipFile(output) as package:
+        assert package.testzip() is None
+        assert len([name for name in package.namelist() if name.startswith('word/media/')]) == 2
@@ -0,0 +1,56 @@
+import re
+
+import pytest
+
+import app
+from app import CompiledRule, compile_replacement, split_protected
+
+
+def rule(find, replace):
+    """A compiled rule that skips rule pack validation, as patterns from older packs could"""
+    return CompiledRule('test_rules', find, re.compile(find), replace, compile_replacement(replace))
+
+
+def apply_rules(text, rule_plan):
+    """text after the rule pass, applying each rule's edits before the next rule runs"""
+    seconds = [0.0] * len(rule_plan)
+    for _, _, edits in app.processor._iter_rule_edits(text, rule_plan, seconds):
+        for start, end, replacement in reversed(edits):
+            text = text[:start] + replacement + text[end:]
+    return text
+
+
+def test_split_protected_marks_segment_edges():
+    segments, protected = split_protected('see [X] now', [(4, 7)])
+    assert segments == ['see ' + app.PROTECTED_SPAN_MARK, app.PROTECTED_SPAN_MARK + ' now']
+    assert protected == ['[X]']
+
+
+@pytest.mark.parametrize('find', [r'\b', '^', '$', r'(?=\w)', r'(?<=\W)'])
+@pytest.mark.parametrize('text, span', [
+    ('see [X] now', '[X]'),
+    ('[X]', '[X]'),
+    ('visit www.mvphealthcare.com next', 'www.mvphealthcare.com'),
+    ('a [link to 5 plans] b [Insert URL] c', '[link to 5 plans]'),
+])
+def test_zero_width_matches_never_edit_protected_content(find, text, span):
+    result = apply_rules(text, (rule(find, '!'),))
+    assert span in result
+    assert result.replace('!', '') == text
+
+
+def test_matches_never_reach_into_protected_content():
+    result = apply_rules('see [X] now www.mvp.org', (rule(r'\S+', 'W'),))
+    assert result == 'W [X] W www.mvp.org'
+
+
+def test_rules_do_not_join_neighbouring_protected_spans():
+    text = 'Use [Insert URL] [Insert URL] here'
+    assert apply_rules(text, (rule(r'\b(\w+) \1\b', r'\1'),)) == text
+
+
+def test_shipped_rules_leave_protected_content_alone():
+    text = 'Call 9:00 am [9:00 am] or visit www.mvphealthcare.com/9:00'
+    result = apply_rules(text, app.processor.rule_plan)
+    assert result.startswith('Call 9 am [9:00 am]')
+    assert result.endswith('www.mvphealthcare.com/9:00')
@@ -0,0 +1,53 @@
+import pytest
+
+import app
+from app import RulePackError, load_rule_packs, validate_rule_pack
+
+
+def pack(**fields):
+    rule = {'category': 'rule', 'find': r'\bfoo\b', 'replace': 'bar'}
+    rule.update(fields)
+    return {'version': app.RULE_PACK_VERSION, 'categories': {'rules': [{k: v for k, v in rule.items() if v is not None}]}}
+
+
+def test_valid_pack():
+    categories = validate_rule_pack(pack(find=r'(\d+) plans', replace=r'\1 plans', case_sensitive=True), 'pack.yaml')
+    assert categories['rules'][0]['category'] == 'rule'
+
+
+def test_shipped_rule_packs_load(tmp_path):
+    categories = load_rule_packs(app.DEFAULT_RULES_DIR, str(tmp_path))
+    assert categories
+    # A second load reads the validated rules back from the cache
+    assert load_rule_packs(app.DEFAULT_RULES_DIR, str(tmp_path)) == categories
+
+
+@pytest.mark.parametrize('data, message', [
+    ({'version': 99, 'categories': {}}, 'version'),
+    (dict(pack(), extra=1), 'unknown top-level field'),
+    (pack(colour='red'), "unknown field 'colour'"),
+    (pack(enabled='yes'), "'enabled' must be a bool"),
+    (pack(category=None), "'category' is required"),
+    (pack(find=None), "'find' is required"),
+    (pack(find='(unclosed'), "invalid 'find' pattern"),
+    (pack(replace=r'\2'), 'missing group 2'),
+    (pack(find='(?P<word>foo)', replace=r'\g<other>'), 'missing group other'),
+    (pack(replace_function='uppercase'), 'exactly one'),
+    (pack(replace=None), 'exactly one'),
+    (pack(replace=None, replace_function='shout'), "unknown replace_function 'shout'"),
+])
+def test_invalid_rules_are_rejected(data, message):
+    with pytest.raises(RulePackError, match=message):
+        validate_rule_pack(data, 'pack.yaml')
+
+
+@pytest.mark.parametrize('find', ['ǂ', '.', r'\w', '[^a-z ]'])
+def test_patterns_matching_the_protected_span_mark_alone_are_rejected(find):
+    with pytest.raises(RulePackError, match='protected span mark'):
+        validate_rule_pack(pack(find=find), 'pack.yaml')
+
+
+@pytest.mark.parametrize('find', [r'\b', '^', '$', 'a*', 'x|', r'\s*', r'(\d*)'])
+def test_patterns_that_can_match_empty_are_rejected(find):
+    with pytest.raises(RulePackError, match='empty string'):
+        validate_rule_pack(pack(find=find, replace='x'), 'pack.yaml')
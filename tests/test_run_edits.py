@@ -0,0 +1,61 @@
+import io
+
+from docx import Document
+
+import app
+from app import apply_run_edits
+
+
+def test_edit_within_one_run():
+    assert apply_run_edits(['Call at 9:00 am', ' today'], [(8, 15, '9 a.m.')]) == ['Call at 9 a.m.', ' today']
+
+
+def test_edit_across_runs_keeps_unchanged_characters_in_their_runs():
+    # '9:00 am' spans both runs; only ':00 am' -> ' a.m.' changes, starting in the first run
+    assert apply_run_edits(['9:', '00 am', ' daily'], [(0, 7, '9 a.m.')]) == ['9 a.m.', '', ' daily']
+
+
+def test_trimmed_edit_lands_in_the_run_where_the_change_starts():
+    # Only 'log in' -> 'login' changes the space, which sits in the second run
+    assert apply_run_edits(['Please log', ' in now'], [(7, 13, 'login')]) == ['Please log', 'in now']
+
+
+def test_insertion_extends_the_previous_run():
+    assert apply_run_edits(['MVP', ' plans'], [(3, 3, '®')]) == ['MVP®', ' plans']
+
+
+def test_deletion_across_runs():
+    assert apply_run_edits(['one  ', '  two'], [(3, 7, ' ')]) == ['one ', 'two']
+
+
+def test_several_edits_apply_against_the_original_offsets():
+    runs = ['1 plan', ' and 2 ', 'plans']
+    edits = [(0, 1, 'one'), (11, 12, 'two')]
+    assert apply_run_edits(runs, edits) == ['one plan', ' and two ', 'plans']
+
+
+def test_unchanged_edit_leaves_runs_alone():
+    assert apply_run_edits(['a', 'b'], [(0, 2, 'ab')]) == ['a', 'b']
+
+
+def corrected_runs(run_texts):
+    """Run texts of a one-paragraph document after the corporate rules"""
+    doc = Document()
+    paragraph = doc.add_paragraph()
+    for text in run_texts:
+        paragraph.add_run(text)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+
+    doc = Document(io.BytesIO(buffer.getvalue()))
+    app.processor.apply_corporate_rules(doc, app.ProcessingContext({'keywords': []}))
+    return [run.text for run in doc.paragraphs[0].runs]
+
+
+def test_rules_apply_across_run_boundaries():
+    expected, = corrected_runs(['Open 9:00 am to 5:00 pm.'])
+    assert expected != 'Open 9:00 am to 5:00 pm.'
+
+    runs = corrected_runs(['Open 9:', '00 am', ' to 5:00 pm.'])
+    assert ''.join(runs) == expected
+    assert len(runs) == 3 and runs[0].startswith('Open 9')